@@ -0,0 +1,277 @@
+"""
+Append-only change log for incremental client sync.
+
+Every flush that touches an ``Event``, ``SwapRequest`` or recurring series
+(including its exceptions) appends entries to ``change_log`` in the same
+transaction, so the log can never disagree with
+the tables it describes. Each entry names its audience: the owner of an
+event, both parties of a swap request, or everyone (``user_id`` NULL) for
+marketplace listings, which use the ``swappable_slot`` entity so clients
+can keep them apart from their own events. ``seq`` is the primary key, so
+a client that is already up to date costs a single index probe.
+
+Writers only append to ``change_log_pending``. ``sequence_changes`` moves
+committed pending entries into ``change_log`` while holding the
+``change_log_lock`` row, so seqs are handed out, and become visible, one
+sequencer at a time and in commit order: /sync cannot step past an entry
+that commits later. Writers never wait on each other for the log; only
+sequencers (each /sync that finds pending entries, and compaction) do.
+
+Compaction drops entries superseded by a newer one for the same row and,
+after a longer retention, old tombstones. Clients whose cursor predates the
+last tombstone purge are told to resync from scratch.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.db import SessionLocal
+from app.utils.recurrence import format_rrule
+
+logger = logging.getLogger(__name__)
+
+# Pending entries moved into change_log per statement
+SEQUENCE_BATCH_SIZE = 1000
+
+
+def event_payload(e: models.Event) -> dict:
+    return {
+        "id": e.id,
+        "title": e.title,
+        "start_time": e.start_time,
+        "end_time": e.end_time,
+        "status": e.status,
+        "owner_id": e.owner_id,
+        "recurrence_id": e.recurrence_id,
+        "occurrence_start": e.occurrence_start,
+    }
+
+
+def swap_payload(s: models.SwapRequest) -> dict:
+    return {
+        "id": s.id,
+        "status": s.status,
+        "requester_id": s.requester_id,
+        "responder_id": s.responder_id,
+        "my_slot_id": s.my_slot_id,
+        "their_slot_id": s.their_slot_id,
+        "expires_at": s.expires_at,
+    }
+
+
+def recurrence_payload(r: models.RecurrenceRule) -> dict:
+    return {
+        "id": r.id,
+        "title": r.title,
+        "start_time": r.dtstart,
+        "end_time": r.dtstart + timedelta(minutes=r.duration_minutes),
+        "rrule": format_rrule(r),
+        "owner_id": r.owner_id,
+        "exceptions": sorted(x.occurrence_start for x in r.exceptions),
+    }
+
+
+def _entry(user_id: Optional[int], entity: str, entity_id: int, payload: Optional[dict]) -> models.ChangeLogPending:
+    return models.ChangeLogPending(
+        user_id=user_id,
+        entity=entity,
+        entity_id=entity_id,
+        op=models.ChangeOp.UPSERT if payload is not None else models.ChangeOp.DELETE,
+        payload=json.dumps(jsonable_encoder(payload)) if payload is not None else None,
+    )
+
+
+def _previous(obj, attr: str):
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+
+def _event_entries(session: Session, obj: models.Event, deleted: bool, new: bool) -> list:
+    entries = []
+    if deleted:
+        entries.append(_entry(obj.owner_id, "event", obj.id, None))
+        if obj.status == "SWAPPABLE":
+            entries.append(_entry(None, "swappable_slot", obj.id, None))
+        return entries
+
+    payload = event_payload(obj)
+    entries.append(_entry(obj.owner_id, "event", obj.id, payload))
+
+    if new:
+        # Rows moved between shards arrive as new objects; see ShardRouter.relocate
+        old_owner = session.info.get("relocated_owners", {}).pop(("events", obj.id), None)
+        old_status = None
+    else:
+        old_owner = _previous(obj, "owner_id")
+        old_status = _previous(obj, "status")
+    if old_owner is not None and old_owner != obj.owner_id:
+        entries.append(_entry(old_owner, "event", obj.id, None))
+
+    # Marketplace audience: listed while SWAPPABLE, tombstoned when it stops being
+    if obj.status == "SWAPPABLE":
+        entries.append(_entry(None, "swappable_slot", obj.id, payload))
+    elif old_status == "SWAPPABLE":
+        entries.append(_entry(None, "swappable_slot", obj.id, None))
+    return entries
+
+
+def _swap_entries(obj: models.SwapRequest, deleted: bool) -> list:
+    payload = None if deleted else swap_payload(obj)
+    return [
+        _entry(obj.requester_id, "swap_request", obj.id, payload),
+        _entry(obj.responder_id, "swap_request", obj.id, payload),
+    ]
+
+
+def _recurrence_entries(session: Session, rules: dict) -> list:
+    # One entry per series, however many of its exceptions changed
+    return [
+        _entry(rule.owner_id, "recurrence_rule", rule_id, None if rule in session.deleted else recurrence_payload(rule))
+        for rule_id, rule in rules.items()
+    ]
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    entries = session.info.setdefault("changefeed_entries", [])
+    rules = {}
+    for objects, new, deleted in ((session.new, True, False), (session.dirty, False, False), (session.deleted, False, True)):
+        for obj in objects:
+            if not (new or deleted) and not session.is_modified(obj, include_collections=False):
+                continue
+            if isinstance(obj, models.Event):
+                entries.extend(_event_entries(session, obj, deleted, new))
+            elif isinstance(obj, models.SwapRequest):
+                entries.extend(_swap_entries(obj, deleted))
+            elif isinstance(obj, models.RecurrenceRule):
+                rules[obj.id] = obj
+            elif isinstance(obj, models.RecurrenceException):
+                rule = obj.rule or session.get(models.RecurrenceRule, obj.rule_id)
+                if rule is not None:
+                    rules[rule.id] = rule
+    entries.extend(_recurrence_entries(session, rules))
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _write_changes(session: Session, flush_context):
+    # Added here, the entries are flushed by the next pass of the same commit
+    entries = session.info.pop("changefeed_entries", None)
+    if entries:
+        session.add_all(entries)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session: Session, previous_transaction):
+    session.info.pop("changefeed_entries", None)
+
+
+def sequence_changes(db: Session) -> int:
+    """
+    Give committed pending entries their seq, in the order they were written,
+    and commit; returns the number of entries moved
+    """
+    pending = models.ChangeLogPending
+    # Checked without the lock, so an idle feed costs readers nothing
+    if db.query(pending.id).first() is None:
+        return 0
+    # Sequencers take turns; seqs of one commit are all below the next one's.
+    # (SQLite serializes writers anyway and ignores FOR UPDATE.)
+    db.execute(select(models.ChangeLogLock.id).where(models.ChangeLogLock.id == 1).with_for_update())
+    moved = 0
+    while True:
+        rows = db.query(pending).order_by(pending.id).limit(SEQUENCE_BATCH_SIZE).all()
+        if not rows:
+            break
+        db.add_all([
+            models.ChangeLogEntry(
+                user_id=row.user_id,
+                entity=row.entity,
+                entity_id=row.entity_id,
+                op=row.op,
+                payload=row.payload,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ])
+        db.query(pending).filter(pending.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        db.flush()
+        moved += len(rows)
+    db.commit()
+    return moved
+
+
+def current_watermark(db: Session) -> int:
+    """Cursors at or below this sequence number may have missed purged tombstones"""
+    return db.query(func.max(models.ChangeLogCompaction.watermark_seq)).scalar() or 0
+
+
+def compact(db: Session, now: Optional[datetime] = None) -> tuple[int, int]:
+    """
+    Drop superseded entries older than CHANGE_LOG_RETENTION_HOURS and
+    tombstones older than CHANGE_LOG_TOMBSTONE_RETENTION_HOURS
+    :return: (superseded entries removed, tombstones removed)
+    """
+    now = now or datetime.utcnow()
+    sequence_changes(db)
+    entries = models.ChangeLogEntry
+    latest = select(func.max(entries.seq)).group_by(entries.user_id, entries.entity, entries.entity_id)
+    superseded = db.query(entries).filter(
+        entries.created_at < now - timedelta(hours=settings.CHANGE_LOG_RETENTION_HOURS),
+        entries.seq.not_in(latest),
+    ).delete(synchronize_session=False)
+
+    tombstone_cutoff = now - timedelta(hours=settings.CHANGE_LOG_TOMBSTONE_RETENTION_HOURS)
+    purged_upto = db.query(func.max(entries.seq)).filter(
+        entries.op == models.ChangeOp.DELETE,
+        entries.created_at < tombstone_cutoff,
+    ).scalar()
+    tombstones = 0
+    if purged_upto is not None:
+        tombstones = db.query(entries).filter(
+            entries.op == models.ChangeOp.DELETE,
+            entries.seq <= purged_upto,
+        ).delete(synchronize_session=False)
+        db.add(models.ChangeLogCompaction(watermark_seq=purged_upto))
+    db.commit()
+    return superseded, tombstones
+
+
+class ChangeLogCompactor:
+    def __init__(self, session_factory=SessionLocal, interval_seconds: int = 3600):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                superseded, tombstones = await asyncio.to_thread(self._compact)
+                logger.info("Compacted change log: %d superseded, %d tombstones", superseded, tombstones)
+            except Exception:
+                logger.exception("Change log compaction failed")
+
+    def _compact(self) -> tuple[int, int]:
+        with self.session_factory() as db:
+            return compact(db)
+
+
+# Global instance
+change_log_compactor = ChangeLogCompactor(interval_seconds=settings.CHANGE_LOG_COMPACT_INTERVAL_SECONDS)
@@ -13,8 +13,59 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./slotswapper.db")
+    # Comma-separated shard URLs; when set, users and their data are spread across them
+    SHARD_DATABASE_URLS: list[str] = [u for u in os.getenv("SHARD_DATABASE_URLS", "").split(",") if u]
     CORS_ORIGINS: list[str] = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
 
+    # Background task queue: "memory" (in-process) or "db" (durable, stored in the app database)
+    TASK_QUEUE_BACKEND: str = os.getenv("TASK_QUEUE_BACKEND", "memory")
+    TASK_WORKERS: int = int(os.getenv("TASK_WORKERS", "2"))
+    TASK_BATCH_SIZE: int = int(os.getenv("TASK_BATCH_SIZE", "50"))
+    TASK_MAX_ATTEMPTS: int = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+    TASK_POLL_INTERVAL_SECONDS: float = float(os.getenv("TASK_POLL_INTERVAL_SECONDS", "1.0"))
+
+    # Pending swap requests lapse after this long (or when either slot starts)
+    SWAP_REQUEST_TTL_MINUTES: int = int(os.getenv("SWAP_REQUEST_TTL_MINUTES", "2880"))
+    SWAP_EXPIRY_BATCH_SIZE: int = int(os.getenv("SWAP_EXPIRY_BATCH_SIZE", "200"))
+
+    # Change feed (/sync) compaction
+    CHANGE_LOG_RETENTION_HOURS: int = int(os.getenv("CHANGE_LOG_RETENTION_HOURS", "24"))
+    CHANGE_LOG_TOMBSTONE_RETENTION_HOURS: int = int(os.getenv("CHANGE_LOG_TOMBSTONE_RETENTION_HOURS", "720"))
+    CHANGE_LOG_COMPACT_INTERVAL_SECONDS: int = int(os.getenv("CHANGE_LOG_COMPACT_INTERVAL_SECONDS", "3600"))
+
+    # Serve the marketplace from an in-memory read model, checked against the database periodically
+    MARKETPLACE_CACHE_ENABLED: bool = os.getenv("MARKETPLACE_CACHE_ENABLED", "true").lower() == "true"
+    MARKETPLACE_RECONCILE_INTERVAL_SECONDS: int = int(os.getenv("MARKETPLACE_RECONCILE_INTERVAL_SECONDS", "60"))
+
+    # iCalendar import: events written per transaction
+    ICS_IMPORT_BATCH_SIZE: int = int(os.getenv("ICS_IMPORT_BATCH_SIZE", "500"))
+
+    # Admission control: total in-flight requests (keep below the threadpool size of 40),
+    # starting per-route limit, queue bound, base queue timeout and the latency/baseline
+    # ratio at which a route's limit is cut
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_CONCURRENCY: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+    ADMISSION_ROUTE_LIMIT: int = int(os.getenv("ADMISSION_ROUTE_LIMIT", "16"))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2.0"))
+    ADMISSION_LATENCY_TOLERANCE: float = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+
+    # Maximum number of sub-requests accepted by POST /batch
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+
+    # Idempotency-Key replay store for write endpoints
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+    # Response compression (brotli is used when the optional module is installed)
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Recurring events: default expansion window and how far ahead new series are conflict-checked
+    RECURRENCE_DEFAULT_WINDOW_DAYS: int = int(os.getenv("RECURRENCE_DEFAULT_WINDOW_DAYS", "30"))
+    RECURRENCE_CONFLICT_HORIZON_DAYS: int = int(os.getenv("RECURRENCE_CONFLICT_HORIZON_DAYS", "365"))
+
 settings = Settings()
 
 # Validate that SECRET_KEY is set
@@ -1,17 +1,71 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, inspect, text, Enum
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.core.config import settings
+from app.sharding import shard_router
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if shard_router:
+    # Sharded mode: shard "0" doubles as the default engine for global tables
+    engine = shard_router.engines["0"]
+    engines = list(shard_router.engines.values())
+    SessionLocal = shard_router.sessionmaker()
+else:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+    )
+    engines = [engine]
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class Base(DeclarativeBase):
     pass
 
-def get_db():
+def add_missing_columns(bind, metadata):
+    """
+    create_all only creates missing tables, so add the columns, indexes and
+    enum values that newer models define on tables an older version already
+    created. Columns are added as nullable since existing rows have no value
+    for them.
+    """
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                added = column._copy()
+                added.nullable = True
+                ddl = CreateColumn(added).compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        if bind.dialect.name == "postgresql":
+            # Native enum types are not touched by create_all either (e.g. EXPIRED)
+            for enum in {c.type for t in metadata.sorted_tables for c in t.columns if isinstance(c.type, Enum)}:
+                for value in enum.enums:
+                    conn.execute(text(f"ALTER TYPE {preparer.format_type(enum)} ADD VALUE IF NOT EXISTS '{value}'"))
+
+def create_tables():
+    """Create missing tables and columns (on every shard when sharding is enabled)"""
+    if shard_router:
+        shard_router.create_all(Base.metadata)
+    else:
+        Base.metadata.create_all(bind=engine)
+    for bind in engines:
+        add_missing_columns(bind, Base.metadata)
+
+def get_db(request: Request):
+    shared = request.scope.get("batch_db")
+    if shared is not None:
+        # Write inside POST /batch: the batch owns and closes this session
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.security import decode_token
@@ -8,9 +8,15 @@ from app import models
 security = HTTPBearer()
 
 def get_current_user(
+    request: Request,
     creds: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
 ) -> models.User:
+    # Sub-requests of POST /batch reuse the principal resolved for the batch
+    batch_user = request.scope.get("batch_user")
+    if batch_user is not None:
+        return batch_user
+
     token = creds.credentials
     try:
         payload = decode_token(token)
@@ -0,0 +1,171 @@
+"""
+Bulk import of iCalendar files as BUSY events.
+
+Events stream out of ``app.utils.ical`` one at a time and are validated
+like ``POST /events/``. They are written in transactions of
+``ICS_IMPORT_BATCH_SIZE``, so memory stays bounded by the batch size
+whatever the file size. After each batch the running report is yielded,
+which lets callers show progress.
+
+Re-importing a file is safe: events whose UID was already imported for
+the user are counted as duplicates. Events overlapping existing ones,
+cancelled events and recurring series are reported and skipped.
+"""
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app import models
+from app.core.config import settings
+from app.db import SessionLocal
+from app.tasks import enqueue
+from app.utils.ical import ICalError, ICalEvent, iter_events
+from app.utils.recurrence import occurrences_in_window
+from app.utils.validators import validate_time_slot
+
+# Skipped events listed individually in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    errors: list[dict] = field(default_factory=list)
+    done: bool = False
+
+    def skip(self, line: Optional[int], uid: Optional[str], reason):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "uid": uid, "reason": reason})
+
+    def as_dict(self) -> dict:
+        return {
+            "read": self.read,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "done": self.done,
+        }
+
+
+def _accept(report: ImportReport, item: ICalEvent | ICalError) -> bool:
+    """Validate one parsed event as POST /events/ would"""
+    if isinstance(item, ICalError):
+        report.skip(item.line, None, str(item))
+        return False
+    if item.cancelled:
+        report.skip(item.line, item.uid, "Event is cancelled")
+        return False
+    if item.recurring:
+        report.skip(item.line, item.uid, "Recurring events are not imported; create them under /recurrences")
+        return False
+    try:
+        validate_time_slot(item.start_time, item.end_time)
+    except HTTPException as exc:
+        report.skip(item.line, item.uid, exc.detail)
+        return False
+    return True
+
+
+def _write_batch(db, owner_id: int, batch: list[ICalEvent], report: ImportReport):
+    uids = {item.uid for item in batch if item.uid}
+    seen = set(db.scalars(
+        select(models.Event.ical_uid).where(
+            models.Event.owner_id == owner_id,
+            models.Event.ical_uid.in_(uids),
+        )
+    )) if uids else set()
+
+    fresh = []
+    for item in batch:
+        if item.uid and item.uid in seen:
+            report.duplicates += 1
+            continue
+        if item.uid:
+            seen.add(item.uid)
+        fresh.append(item)
+    if not fresh:
+        return
+
+    fresh.sort(key=lambda item: item.start_time)
+    window_start, window_end = fresh[0].start_time, max(item.end_time for item in fresh)
+    busy = db.query(models.Event.start_time, models.Event.end_time).filter(
+        models.Event.owner_id == owner_id,
+        models.Event.start_time < window_end,
+        models.Event.end_time > window_start,
+    ).all()
+    busy = [tuple(row) for row in busy]
+    busy += [(o.start_time, o.end_time) for o in occurrences_in_window(db, owner_id, window_start, window_end)]
+    busy.sort()
+    # Events can overlap (swaps and updates are not conflict-checked), so an
+    # earlier event may end after a later one; reach[i] is the latest end of
+    # busy[0..i], and an item conflicts iff the reach before its end passes its start
+    starts, reach = [], []
+    for start, end in busy:
+        starts.append(start)
+        reach.append(max(reach[-1], end) if reach else end)
+
+    events = []
+    for item in fresh:
+        at = bisect_left(starts, item.end_time)
+        if at and reach[at - 1] > item.start_time:
+            report.skip(item.line, item.uid, "Time slot conflicts with existing events")
+            continue
+        at = bisect_left(starts, item.start_time)
+        starts.insert(at, item.start_time)
+        reach.insert(at, max(reach[at - 1], item.end_time) if at else item.end_time)
+        for i in range(at + 1, len(reach)):
+            if reach[i] >= reach[at]:
+                break
+            reach[i] = reach[at]
+        events.append(models.Event(
+            title=item.title,
+            start_time=item.start_time,
+            end_time=item.end_time,
+            status="BUSY",
+            owner_id=owner_id,
+            ical_uid=item.uid,
+        ))
+
+    if events:
+        db.add_all(events)
+        enqueue(db, "event.changed", action="imported", owner_id=owner_id, count=len(events))
+        db.commit()
+        report.imported += len(events)
+
+
+def import_events(lines: Iterable[str], owner_id: int, session_factory=SessionLocal,
+                  batch_size: Optional[int] = None) -> Iterator[ImportReport]:
+    """
+    Import an iCalendar stream for ``owner_id``, yielding the running report
+    after every committed batch and once more when the stream is exhausted
+    """
+    batch_size = batch_size or settings.ICS_IMPORT_BATCH_SIZE
+    report = ImportReport()
+    batch: list[ICalEvent] = []
+    with session_factory() as db:
+        try:
+            for item in iter_events(lines):
+                report.read += 1
+                if _accept(report, item):
+                    batch.append(item)
+                if len(batch) >= batch_size:
+                    _write_batch(db, owner_id, batch, report)
+                    # Committed rows are not needed again; keep the identity map small
+                    db.expunge_all()
+                    batch = []
+                    yield report
+        except ICalError as exc:
+            # The rest of the file is unreadable; keep what was read so far
+            report.skip(exc.line, None, str(exc))
+        if batch:
+            _write_batch(db, owner_id, batch, report)
+    report.done = True
+    yield report
@@ -4,12 +4,19 @@ from fastapi.responses import JSONResponse
 from datetime import datetime
 import time
 from app.middleware.rate_limiter import rate_limiter, api_stats
-from app.db import Base, engine
+from app.middleware.idempotency import idempotency_store
+from app.middleware.compression import response_compressor
+from app.middleware.admission import admission_controller
+from app.db import create_tables
 from app.core.config import settings
-from app.routers import auth, events, swap
+from app.routers import auth, events, swap, recurrence, sync, batch
+from app.changefeed import change_log_compactor
+from app.marketplace import marketplace_reconciler
+from app.tasks import task_queue
+from app.tasks.expiry import expiry_scheduler
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables (on every shard when sharding is enabled)
+create_tables()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -42,10 +49,28 @@ async def add_api_version(request: Request, call_next):
     response.headers["X-API-Version"] = "2.0.0"
     return response
 
+@app.on_event("startup")
+async def start_background_workers():
+    await task_queue.start()
+    await expiry_scheduler.start()
+    await change_log_compactor.start()
+    if settings.MARKETPLACE_CACHE_ENABLED:
+        await marketplace_reconciler.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await marketplace_reconciler.stop()
+    await change_log_compactor.stop()
+    await expiry_scheduler.stop()
+    await task_queue.stop()
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(events.router)
 app.include_router(swap.router)
+app.include_router(recurrence.router)
+app.include_router(sync.router)
+app.include_router(batch.router)
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
@@ -69,6 +94,21 @@ async def rate_limit_middleware(request: Request, call_next):
     
     return response
 
+@app.middleware("http")
+async def idempotency_middleware(request: Request, call_next):
+    # Sits outside the rate limiter and routers: replays skip the rest of the pipeline
+    return await idempotency_store.dispatch(request, call_next)
+
+@app.middleware("http")
+async def compression_middleware(request: Request, call_next):
+    # Outside the routers and idempotency store, so replayed and freshly built responses are compressed alike
+    return await response_compressor.dispatch(request, call_next)
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    # Outermost: overloaded requests are shed before doing any other work
+    return await admission_controller.dispatch(request, call_next)
+
 @app.get("/")
 async def root():
     return {
@@ -81,4 +121,4 @@ async def root():
 @app.get("/api/stats")
 async def get_api_stats():
     """Get API usage statistics"""
-    return api_stats.get_stats()
\ No newline at end of file
+    return {**api_stats.get_stats(), "admission": admission_controller.stats()}
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+In-process read model of the marketplace (every SWAPPABLE slot).
+
+Slots are kept as ``__slots__`` records in a list sorted by
+``(start_time, id)``, with a parallel list of keys so window queries are two
+bisects. Readers never lock: writers build new lists and swap them in with a
+single assignment.
+
+Changes to events are picked up from every session: staged at flush, applied
+when the transaction commits, dropped on rollback. Each staged change is
+stamped at flush, while the writer holds the row's lock, so a change that
+arrives after a newer one for the same event is dropped. Bulk updates and
+writes from other processes are not seen, so a reconciler periodically
+compares the model with the database and repairs the slots that differ.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.db import SessionLocal
+from app.sharding import shard_router
+
+logger = logging.getLogger(__name__)
+
+# Orders the changes staged by all sessions of this process
+_stamps = itertools.count(1)
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Match what the database hands back, so keys stay comparable
+    return value.replace(tzinfo=None) if value is not None else None
+
+
+class SlotRecord:
+    __slots__ = ("id", "title", "start_time", "end_time", "status", "owner_id", "recurrence_id", "occurrence_start")
+
+    def __init__(self, e: models.Event):
+        self.id = e.id
+        self.title = e.title
+        self.start_time = _naive(e.start_time)
+        self.end_time = _naive(e.end_time)
+        self.status = e.status.value if hasattr(e.status, "value") else e.status
+        self.owner_id = e.owner_id
+        self.recurrence_id = e.recurrence_id
+        self.occurrence_start = _naive(e.occurrence_start)
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+class MarketplaceIndex:
+    def __init__(self):
+        self._keys: list[tuple[datetime, int]] = []
+        self._records: list[SlotRecord] = []
+        self._key_of: dict[int, tuple[datetime, int]] = {}
+        # event id -> (stamp, version) of the last change applied to it
+        self._applied: dict[int, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self.ready = False
+
+    def load(self, records: list[SlotRecord], since: int = 0):
+        """Replace every slot with ``records``, read from the database after version ``since``"""
+        with self._lock:
+            self._swap(records)
+            self._prune(since)
+            self.ready = True
+
+    def _swap(self, records: list[SlotRecord]):
+        records = sorted(records, key=lambda r: (r.start_time, r.id))
+        keys = [(r.start_time, r.id) for r in records]
+        self._keys, self._records = keys, records
+        self._key_of = {key[1]: key for key in keys}
+        self.version += 1
+
+    def _prune(self, since: int):
+        # The database read covers changes up to ``since``; later reads cover
+        # them too, so their stamps are no longer needed to order anything
+        self._applied = {i: applied for i, applied in self._applied.items() if applied[1] > since}
+
+    def apply(self, changes: dict[int, tuple[int, Optional[SlotRecord]]]):
+        """Upsert or (for None) remove slots by event id; changes are (stamp, record)"""
+        with self._lock:
+            keys, records, key_of = list(self._keys), list(self._records), dict(self._key_of)
+            version = self.version + 1
+            for event_id, (stamp, record) in changes.items():
+                if self._applied.get(event_id, (0, 0))[0] > stamp:
+                    continue  # A newer change to this event was applied first
+                self._applied[event_id] = (stamp, version)
+                old = key_of.pop(event_id, None)
+                if old is not None:
+                    at = bisect_left(keys, old)
+                    del keys[at], records[at]
+                if record is not None:
+                    key = key_of[event_id] = (record.start_time, record.id)
+                    at = bisect_left(keys, key)
+                    keys.insert(at, key)
+                    records.insert(at, record)
+            self._keys, self._records, self._key_of = keys, records, key_of
+            self.version = version
+
+    def repair(self, records: list[SlotRecord], since: int) -> bool:
+        """
+        Replace slots that differ from ``records`` (read from the database
+        after version ``since``), keeping those changed since then: the model
+        is at least as new as the read for those. Returns True if any differed.
+        """
+        with self._lock:
+            current = {r.id: r for r in self._records}
+            fresh = {r.id: r for r in records}
+            merged = {}
+            for event_id in current.keys() | fresh.keys():
+                source = current if self._applied.get(event_id, (0, 0))[1] > since else fresh
+                if event_id in source:
+                    merged[event_id] = source[event_id]
+            self._prune(since)
+            if {i: r.values() for i, r in merged.items()} == {i: r.values() for i, r in current.items()}:
+                return False
+            self._swap(list(merged.values()))
+            return True
+
+    def window(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               exclude_owner: Optional[int] = None) -> list[SlotRecord]:
+        """Slots starting at or after ``start`` and ending by ``end``, by start time"""
+        # Writers swap the lists, never mutate them, so one read is a consistent view
+        keys, records = self._keys, self._records
+        start, end = _naive(start), _naive(end)
+        lo = bisect_left(keys, (start,)) if start else 0
+        hi = bisect_right(keys, (end, float("inf"))) if end else len(keys)
+        return [
+            r for r in records[lo:hi]
+            if r.owner_id != exclude_owner and (end is None or r.end_time <= end)
+        ]
+
+
+def load_swappable(db: Session) -> list[SlotRecord]:
+    statement = select(models.Event).where(models.Event.status == "SWAPPABLE")
+    if shard_router:
+        rows = shard_router.fan_out(statement.order_by(models.Event.start_time, models.Event.id),
+                                    key=lambda e: (e.start_time, e.id))
+    else:
+        rows = db.scalars(statement).all()
+    return [SlotRecord(e) for e in rows]
+
+
+@event.listens_for(Session, "after_flush")
+def _stage_slots(session: Session, flush_context):
+    staged = session.info.setdefault("marketplace_changes", {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models.Event) and obj.id is not None:
+            staged[obj.id] = (next(_stamps), SlotRecord(obj) if obj.status == "SWAPPABLE" else None)
+    for obj in session.deleted:
+        if isinstance(obj, models.Event):
+            staged[obj.id] = (next(_stamps), None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_slots(session: Session):
+    staged = session.info.pop("marketplace_changes", None)
+    if staged and marketplace.ready:
+        marketplace.apply(staged)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_slots(session: Session, previous_transaction):
+    session.info.pop("marketplace_changes", None)
+
+
+class MarketplaceReconciler:
+    def __init__(self, index: MarketplaceIndex, session_factory=SessionLocal, interval_seconds: int = 60):
+        self.index = index
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await asyncio.to_thread(self.rebuild)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def rebuild(self):
+        version = self.index.version
+        with self.session_factory() as db:
+            self.index.load(load_swappable(db), since=version)
+        logger.info("Marketplace read model loaded")
+
+    def reconcile(self) -> bool:
+        """Repair slots that drifted from the database; returns True if any had"""
+        version = self.index.version
+        with self.session_factory() as db:
+            records = load_swappable(db)
+        if not self.index.repair(records, since=version):
+            return False
+        logger.warning("Marketplace read model drifted from the database; repaired")
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except Exception:
+                logger.exception("Marketplace reconciliation failed")
+
+
+# Global instances
+marketplace = MarketplaceIndex()
+marketplace_reconciler = MarketplaceReconciler(marketplace, interval_seconds=settings.MARKETPLACE_RECONCILE_INTERVAL_SECONDS)
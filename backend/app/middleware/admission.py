@@ -0,0 +1,283 @@
+"""
+Admission control and load shedding.
+
+Every request (except the cheap exempt paths) must get a slot from the
+limiter of its route and then from a global limiter that bounds the
+whole pipeline below the threadpool size. ``POST /batch`` takes no slot
+itself; each of its sub-requests is admitted like a request of its own. A request that cannot get a slot
+within its priority class's queue timeout is shed with ``503`` and
+``Retry-After`` instead of queuing without bound.
+
+Route limits adapt to observed latency (AIMD) while the route is
+saturated: if its latency rises well above its own long-run average the
+limit is cut, otherwise it is raised by one per window. The global
+limiter serves queued requests by priority, so logins and swap responses
+get ahead of marketplace browsing, and low-priority requests are the
+first to be evicted when the queue is full.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+
+from app.core.config import settings
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+# Endpoints that never queue: liveness and stats must answer during overload
+EXEMPT_PATHS = {"/", "/api/stats", "/api/docs", "/api/redoc", "/openapi.json"}
+
+# Endpoints that admit their own sub-requests instead of holding one slot for all of them
+SELF_ADMITTED_PATHS = {"/batch"}
+
+# (method, route path) -> priority; everything else is NORMAL
+ROUTE_PRIORITIES = {
+    ("POST", "/auth/login"): Priority.HIGH,
+    ("POST", "/swap/swap-response/{request_id}"): Priority.HIGH,
+    ("GET", "/swap/swappable-slots"): Priority.LOW,
+}
+
+# How long each class may wait for a slot, relative to ADMISSION_QUEUE_TIMEOUT_SECONDS
+QUEUE_TIMEOUT_FACTORS = {Priority.HIGH: 2.0, Priority.NORMAL: 1.0, Priority.LOW: 0.25}
+
+# Weight of each sample in a route's baseline latency
+BASELINE_WEIGHT = 0.01
+
+
+OVERLOADED_DETAIL = "Server is overloaded, please retry shortly"
+
+
+class Shed(Exception):
+    """Raised when a request has to be turned away"""
+    retry_after = 1
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded number of in-flight requests with a priority-ordered wait queue.
+    Only used from the event loop, so it needs no locking.
+    """
+
+    def __init__(self, limit: float, min_limit: int, max_limit: int, max_queue: int,
+                 adaptive: bool = False, tolerance: float = 2.0):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.adaptive = adaptive
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.shed = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._queued = 0
+        self._order = itertools.count()
+        # Latency tracking (seconds) for the adaptive limit
+        self.baseline: Optional[float] = None
+        self.smoothed: Optional[float] = None
+        self._last_decrease = 0.0
+
+    async def acquire(self, priority: Priority, timeout: float):
+        if self.in_flight < int(self.limit) and not self._queued:
+            self.in_flight += 1
+            return
+        if self._queued >= self.max_queue:
+            self._evict_below(priority)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._queued -= 1
+            elif future.result():
+                return  # Granted just as the timeout fired
+            self.shed += 1
+            raise Shed()
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back a slot we may have been given
+            if future.done() and not future.cancelled() and future.result():
+                self.release(None)
+            elif not future.done():
+                future.cancel()
+                self._queued -= 1
+            raise
+        if not future.result():
+            self.shed += 1
+            raise Shed()
+
+    def _evict_below(self, priority: Priority):
+        """Make room by shedding the most recent waiter of a lower priority"""
+        candidates = [w for w in self._waiters if not w[2].done() and w[0] > priority]
+        if not candidates:
+            self.shed += 1
+            raise Shed()
+        victim = max(candidates)
+        victim[2].set_result(False)
+        self._queued -= 1
+
+    def release(self, latency: Optional[float]):
+        self.in_flight -= 1
+        if latency is not None and self.adaptive:
+            self._observe(latency)
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._queued -= 1
+            self.in_flight += 1
+            future.set_result(True)
+
+    def _observe(self, latency: float):
+        """AIMD: while saturated, cut the limit when latency runs well above its norm, otherwise grow it"""
+        self.smoothed = latency if self.smoothed is None else 0.9 * self.smoothed + 0.1 * latency
+        # The norm is a slow average, not the fastest request ever seen: ordinary
+        # variance barely moves it, a lasting change in cost becomes normal within
+        # a few hundred requests
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * BASELINE_WEIGHT
+
+        # Latency says nothing about the limit unless requests are queuing at it
+        if not self._queued and self.in_flight + 1 < int(self.limit):
+            return
+        now = time.monotonic()
+        if self.smoothed > self.baseline * self.tolerance:
+            # At most one cut per smoothed round-trip, so one burst is not punished repeatedly
+            if now - self._last_decrease >= self.smoothed:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def retry_after(self) -> int:
+        """Rough seconds until the current queue drains"""
+        per_request = self.smoothed or 1.0
+        return max(1, math.ceil(per_request * (self._queued + 1) / max(int(self.limit), 1)))
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "shed": self.shed,
+            "latency_ms": round(self.smoothed * 1000, 1) if self.smoothed is not None else None,
+        }
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = 32, route_limit: int = 16, min_route_limit: int = 1,
+                 max_queue: int = 64, queue_timeout: float = 2.0, tolerance: float = 2.0, enabled: bool = True):
+        self.enabled = enabled
+        self.queue_timeout = queue_timeout
+        self.route_limit = route_limit
+        self.min_route_limit = min_route_limit
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.tolerance = tolerance
+        self.global_limiter = ConcurrencyLimiter(max_concurrency, max_concurrency, max_concurrency, max_queue)
+        self.routes: dict[str, ConcurrencyLimiter] = {}
+
+    def classify(self, request: Request) -> tuple[str, Priority]:
+        """Route template (e.g. ``PUT /events/{event_id}``) and priority of a request"""
+        path = "(unmatched)"
+        for route in request.app.router.routes:
+            match, _ = route.matches(request.scope)
+            if match is Match.FULL:
+                path = route.path
+                break
+        return f"{request.method} {path}", ROUTE_PRIORITIES.get((request.method, path), Priority.NORMAL)
+
+    def _route_limiter(self, key: str) -> ConcurrencyLimiter:
+        limiter = self.routes.get(key)
+        if limiter is None:
+            limiter = self.routes[key] = ConcurrencyLimiter(
+                self.route_limit, self.min_route_limit, self.max_concurrency, self.max_queue,
+                adaptive=True, tolerance=self.tolerance,
+            )
+        return limiter
+
+    @asynccontextmanager
+    async def admit(self, request: Request):
+        """Hold a route and a global slot for the body of the block; raises Shed if none is free in time"""
+        if not self.enabled or request.url.path in EXEMPT_PATHS or request.method == "OPTIONS":
+            yield
+            return
+
+        key, priority = self.classify(request)
+        route = self._route_limiter(key)
+        timeout = self.queue_timeout * QUEUE_TIMEOUT_FACTORS[priority]
+        deadline = time.monotonic() + timeout
+        try:
+            await route.acquire(priority, timeout)
+        except Shed as exc:
+            exc.retry_after = route.retry_after()
+            raise
+        try:
+            await self.global_limiter.acquire(priority, max(deadline - time.monotonic(), 0.001))
+        except Shed as exc:
+            route.release(None)
+            exc.retry_after = self.global_limiter.retry_after()
+            raise
+        except BaseException:
+            route.release(None)
+            raise
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.global_limiter.release(None)
+            route.release(time.monotonic() - started)
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path in SELF_ADMITTED_PATHS:
+            return await call_next(request)
+        try:
+            # Slots are held until the response headers are ready; streamed bodies
+            # (e.g. the calendar import) finish outside the limit
+            async with self.admit(request):
+                return await call_next(request)
+        except Shed as exc:
+            return self.overloaded(exc.retry_after)
+
+    @staticmethod
+    def overloaded(retry_after: int) -> JSONResponse:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": OVERLOADED_DETAIL},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def stats(self) -> dict:
+        return {
+            "global": self.global_limiter.stats(),
+            "routes": {key: limiter.stats() for key, limiter in sorted(self.routes.items())},
+        }
+
+
+# Global instance
+admission_controller = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    route_limit=settings.ADMISSION_ROUTE_LIMIT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    tolerance=settings.ADMISSION_LATENCY_TOLERANCE,
+    enabled=settings.ADMISSION_ENABLED,
+)
@@ -0,0 +1,86 @@
+from fastapi import Request, Response
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+from app.core.config import settings
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    codings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[name.strip().lower()] = q
+    return codings
+
+
+class ResponseCompressor:
+    """
+    Negotiated br/gzip compression for responses above a size threshold.
+    Brotli is preferred when the client accepts it and the module is installed.
+    """
+
+    def __init__(self, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def choose_encoding(self, accept_encoding: str) -> str | None:
+        codings = parse_accept_encoding(accept_encoding)
+        candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+        best, best_q = None, 0.0
+        for coding in candidates:
+            q = codings.get(coding, codings.get("*", 0.0))
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        accept_encoding = request.headers.get("accept-encoding", "")
+        content_type = response.headers.get("content-type", "")
+        if (
+            not accept_encoding
+            or "content-encoding" in response.headers
+            or not content_type.startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        headers["vary"] = ", ".join(filter(None, [headers.get("vary"), "Accept-Encoding"]))
+
+        encoding = self.choose_encoding(accept_encoding) if len(body) >= self.minimum_size else None
+        if encoding:
+            body = self.compress(body, encoding)
+            headers["content-encoding"] = encoding
+
+        return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+# Global instance
+response_compressor = ResponseCompressor(
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
@@ -0,0 +1,129 @@
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from collections import OrderedDict
+from dataclasses import dataclass
+import asyncio
+import hashlib
+import time
+from app.core.config import settings
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+
+# Responses that say nothing about the outcome of the request itself
+# (unauthenticated, timed out, conflicting, rate limited); a retry must run it
+TRANSIENT_STATUSES = {401, 408, 409, 429}
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    headers: list[tuple[str, str]]
+    body: bytes
+    expires_at: float
+
+
+class IdempotencyStore:
+    """
+    Bounded LRU of responses keyed by ``Idempotency-Key``.
+
+    A duplicate key replays the stored response without running the handler,
+    and concurrent duplicates wait on the first request instead of racing it.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, StoredResponse] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def get(self, key: str) -> StoredResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: StoredResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def scope_key(request: Request, key: str) -> str:
+        # Keys are only unique per client, so scope them by credentials and route
+        principal = request.headers.get("authorization") or request.client.host
+        raw = f"{principal}\n{request.method}\n{request.url.path}\n{key}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def dispatch(self, request: Request, call_next):
+        key = request.headers.get("idempotency-key")
+        if not key or request.method not in IDEMPOTENT_METHODS:
+            return await call_next(request)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return JSONResponse(
+                status_code=400,
+                content={"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"}
+            )
+
+        scoped = self.scope_key(request, key)
+        fingerprint = hashlib.sha256(await request.body()).hexdigest()
+
+        entry = self.get(scoped)
+        if entry is None and scoped in self._inflight:
+            entry = await asyncio.shield(self._inflight[scoped])
+        if entry is not None:
+            return self._replay(entry, fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[scoped] = future
+        try:
+            response = await call_next(request)
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            entry = StoredResponse(
+                fingerprint=fingerprint,
+                status_code=response.status_code,
+                headers=[
+                    (k, v) for k, v in response.headers.items()
+                    if k.lower() not in ("content-length", "x-process-time")
+                ],
+                body=body,
+                expires_at=time.time() + self.ttl_seconds,
+            )
+            # Server errors and transient refusals are not remembered so that a later retry can succeed
+            if response.status_code < 500 and response.status_code not in TRANSIENT_STATUSES:
+                self.put(scoped, entry)
+            future.set_result(entry)
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Waiters re-raise through the shielded future; mark it retrieved here
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(scoped, None)
+
+        return Response(content=entry.body, status_code=entry.status_code, headers=dict(entry.headers))
+
+    @staticmethod
+    def _replay(entry: StoredResponse, fingerprint: str) -> Response:
+        if entry.fingerprint != fingerprint:
+            return JSONResponse(
+                status_code=422,
+                content={"detail": "Idempotency-Key was already used with a different request body"}
+            )
+        response = Response(content=entry.body, status_code=entry.status_code, headers=dict(entry.headers))
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+
+# Global instance
+idempotency_store = IdempotencyStore(
+    max_entries=settings.IDEMPOTENCY_MAX_KEYS,
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, DateTime, Enum, ForeignKey
+from sqlalchemy import String, Integer, DateTime, Enum, ForeignKey, Text, DDL, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum as PyEnum
 from datetime import datetime
@@ -16,6 +16,23 @@ class RequestStatus(str, PyEnum):
     PENDING = "PENDING"
     ACCEPTED = "ACCEPTED"
     REJECTED = "REJECTED"
+    EXPIRED = "EXPIRED"
+
+
+class Frequency(str, PyEnum):
+    DAILY = "DAILY"
+    WEEKLY = "WEEKLY"
+
+
+class ChangeOp(str, PyEnum):
+    UPSERT = "UPSERT"
+    DELETE = "DELETE"
+
+
+class JobStatus(str, PyEnum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    FAILED = "FAILED"
 
 
 # ✅ User model
@@ -40,6 +57,11 @@ class User(Base):
         "SwapRequest", foreign_keys="SwapRequest.responder_id", back_populates="responder"
     )
 
+    # Recurring event series
+    recurrence_rules: Mapped[list["RecurrenceRule"]] = relationship(
+        "RecurrenceRule", back_populates="owner", cascade="all, delete-orphan"
+    )
+
 
 # ✅ Event model
 class Event(Base):
@@ -52,6 +74,15 @@ class Event(Base):
     status: Mapped[SlotStatus] = mapped_column(Enum(SlotStatus), default=SlotStatus.BUSY)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
 
+    # Set when this event is a materialized occurrence of a recurring series
+    recurrence_id: Mapped[int | None] = mapped_column(
+        ForeignKey("recurrence_rules.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    occurrence_start: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    # UID of the iCalendar event this was imported from, used to skip re-imports
+    ical_uid: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
+
     # Relationship back to user
     owner: Mapped["User"] = relationship("User", back_populates="events")
 
@@ -74,6 +105,9 @@ class SwapRequest(Base):
     my_slot_id: Mapped[int] = mapped_column(ForeignKey("events.id", ondelete="CASCADE"))
     their_slot_id: Mapped[int] = mapped_column(ForeignKey("events.id", ondelete="CASCADE"))
     status: Mapped[RequestStatus] = mapped_column(Enum(RequestStatus), default=RequestStatus.PENDING)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Deadline for a response; indexed so the expiry scheduler can recover after restarts
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
 
     # Relationships
     requester: Mapped["User"] = relationship(
@@ -87,4 +121,103 @@ class SwapRequest(Base):
     )
     their_slot: Mapped["Event"] = relationship(
         "Event", foreign_keys=[their_slot_id], back_populates="received_swaps"
-    )
\ No newline at end of file
+    )
+
+
+# ✅ RecurrenceRule model (stored once, occurrences expanded on read)
+class RecurrenceRule(Base):
+    __tablename__ = "recurrence_rules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    title: Mapped[str] = mapped_column(String(255))
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    dtstart: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False)
+    freq: Mapped[Frequency] = mapped_column(Enum(Frequency))
+    interval: Mapped[int] = mapped_column(Integer, default=1)
+    by_weekday: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # End of the last occurrence (NULL for open-ended series), used to prune window queries
+    series_end: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+
+    owner: Mapped["User"] = relationship("User", back_populates="recurrence_rules")
+    exceptions: Mapped[list["RecurrenceException"]] = relationship(
+        "RecurrenceException", back_populates="rule", cascade="all, delete-orphan"
+    )
+
+
+# ✅ RecurrenceException model (cancelled occurrences of a series)
+class RecurrenceException(Base):
+    __tablename__ = "recurrence_exceptions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    rule_id: Mapped[int] = mapped_column(ForeignKey("recurrence_rules.id", ondelete="CASCADE"), index=True)
+    occurrence_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    rule: Mapped["RecurrenceRule"] = relationship("RecurrenceRule", back_populates="exceptions")
+
+
+# ✅ TaskJob model (durable background job queue)
+class TaskJob(Base):
+    __tablename__ = "task_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(100))
+    payload: Mapped[str] = mapped_column(Text, default="{}")
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.PENDING, index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    run_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+# ✅ ChangeLogEntry model (append-only change feed for /sync)
+class ChangeLogEntry(Base):
+    __tablename__ = "change_log"
+    # AUTOINCREMENT keeps seq monotonic on SQLite even after compaction deletes rows
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    entity: Mapped[str] = mapped_column(String(30))
+    entity_id: Mapped[int] = mapped_column(Integer)
+    op: Mapped[ChangeOp] = mapped_column(Enum(ChangeOp))
+    payload: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+# ✅ ChangeLogPending model (change-log entries written but not yet given a seq)
+class ChangeLogPending(Base):
+    __tablename__ = "change_log_pending"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    entity: Mapped[str] = mapped_column(String(30))
+    entity_id: Mapped[int] = mapped_column(Integer)
+    op: Mapped[ChangeOp] = mapped_column(Enum(ChangeOp))
+    payload: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+# ✅ ChangeLogCompaction model (tombstone purge watermarks)
+class ChangeLogCompaction(Base):
+    __tablename__ = "change_log_compactions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    watermark_seq: Mapped[int] = mapped_column(Integer)
+    compacted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+# ✅ ChangeLogLock model (single row that change-log sequencers lock until commit)
+class ChangeLogLock(Base):
+    __tablename__ = "change_log_lock"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+
+event.listen(ChangeLogLock.__table__, "after_create", DDL("INSERT INTO change_log_lock (id) VALUES (1)"))
+
+
+# Session listeners that keep the change feed and the marketplace read model
+# current; imported here so every writer (API, CLI scripts) registers them
+from app import changefeed, marketplace  # noqa: E402,F401
@@ -0,0 +1,147 @@
+"""
+POST /batch: run several API calls in one round-trip.
+
+Sub-requests are dispatched straight to the routers, so they skip the HTTP
+and middleware work the batch itself already paid for. The caller is
+authenticated once and that user is handed to every sub-request. Runs of
+consecutive GETs execute concurrently, each on its own session because
+sessions are not thread-safe. Writes run one at a time, in order, on the
+batch's session. Each sub-request goes through the rate limiter and
+admission control on its own, so a batch cannot run more work than the
+limits allow. Login and registration cannot be batched at all.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from starlette.middleware.exceptions import ExceptionMiddleware
+
+from app import models, schemas
+from app.core.config import settings
+from app.db import get_db
+from app.deps import get_current_user
+from app.middleware.admission import admission_controller, Shed, OVERLOADED_DETAIL
+from app.middleware.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+# Paths that must arrive as requests of their own
+UNBATCHABLE_PREFIXES = ("/batch", "/auth")
+
+
+async def _dispatch(asgi, request: Request, item: schemas.BatchItem, user: models.User, db: Session | None) -> dict:
+    url = urlsplit(item.path)
+    body = json.dumps(item.body).encode() if item.body is not None else b""
+    headers = [(b"content-type", b"application/json")]
+    if "authorization" in request.headers:
+        headers.append((b"authorization", request.headers["authorization"].encode()))
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": "1.1",
+        "method": item.method,
+        "scheme": request.url.scheme,
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "app": request.app,
+        "state": {},
+        "batch_user": user,
+        "batch_db": db,
+    }
+
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    status_code, chunks = 500, []
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    # Counted like a request of its own, or one batch could carry many
+    if not rate_limiter.is_allowed(request.client.host):
+        return {"status": 429, "body": {"error": "Too many requests", "retry_after": "60 seconds"}}
+
+    try:
+        # The batch holds no admission slot; each sub-request competes for its own
+        async with admission_controller.admit(Request(scope)):
+            await asgi(scope, receive, send)
+    except Shed:
+        return {"status": 503, "body": {"detail": OVERLOADED_DETAIL}}
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", item.method, item.path)
+        return {"status": 500, "body": {"detail": "Internal Server Error"}}
+
+    payload = b"".join(chunks)
+    try:
+        content = json.loads(payload) if payload else None
+    except ValueError:
+        content = payload.decode(errors="replace")
+    return {"status": status_code, "body": content}
+
+
+@router.post("", response_model=schemas.BatchResponse)
+async def run_batch(
+    batch: schemas.BatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Run up to BATCH_MAX_REQUESTS API calls and return their results in order"""
+    if len(batch.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_REQUESTS} requests per batch")
+    for item in batch.requests:
+        path = urlsplit(item.path).path.rstrip("/")
+        if any(path == prefix or path.startswith(prefix + "/") for prefix in UNBATCHABLE_PREFIXES):
+            raise HTTPException(status_code=400, detail=f"{path} cannot be called inside a batch")
+
+    # Detached with its columns loaded, so sub-requests on any session or
+    # thread can read it and commits below cannot expire it
+    db.expunge(current_user)
+
+    # Routers only; HTTPException and validation errors still become responses
+    asgi = ExceptionMiddleware(request.app.router, handlers=request.app.exception_handlers)
+
+    results: list[dict] = []
+    reads: list[schemas.BatchItem] = []
+
+    async def flush_reads():
+        if reads:
+            results.extend(await asyncio.gather(
+                *(_dispatch(asgi, request, item, current_user, None) for item in reads)
+            ))
+            reads.clear()
+
+    for item in batch.requests:
+        if item.method == "GET":
+            reads.append(item)
+            continue
+        # Writes see everything before them and nothing after them
+        await flush_reads()
+        result = await _dispatch(asgi, request, item, current_user, db)
+        if result["status"] >= 400:
+            # A failed write must not leak half-applied changes into the next one
+            db.rollback()
+        results.append(result)
+    await flush_reads()
+
+    return {"responses": results}
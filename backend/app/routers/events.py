@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
 from datetime import datetime, timedelta
 from typing import Optional, List
+import heapq
+import io
+import json
+import os
 from app import models, schemas
+from app.core.config import settings
 from app.db import get_db
 from app.deps import get_current_user
 from app.utils.validators import validate_time_slot
+from app.utils.recurrence import occurrences_in_window, detach_occurrence
+from app.utils.fields import EVENT_FIELDS, parse_fields, load_event_columns, sparse_response
+from app.tasks import enqueue
+from app.tasks.expiry import expiry_scheduler, refresh_deadlines
+from app.ical_import import import_events
 
 router = APIRouter(prefix="/events", tags=["Events"])
 
@@ -17,6 +28,8 @@ def get_my_events(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     search: Optional[str] = Query(None, min_length=3),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    include_occurrences: bool = Query(False, description="Also return unmaterialized occurrences of recurring events"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -25,8 +38,16 @@ def get_my_events(
     - Filter by status
     - Filter by date range
     - Search by title
+    - Select fields (e.g. fields=id,title,start_time)
+
+    With include_occurrences=true, occurrences of recurring events are expanded
+    within the requested window (defaulting to RECURRENCE_DEFAULT_WINDOW_DAYS
+    from now). They have no id, so they cannot be updated or deleted directly.
     """
+    selected = parse_fields(fields, EVENT_FIELDS)
     query = db.query(models.Event).filter(models.Event.owner_id == current_user.id)
+    if selected:
+        query = query.options(load_event_columns(selected, "start_time"))
     
     if status:
         query = query.filter(models.Event.status == status)
@@ -40,7 +61,23 @@ def get_my_events(
     if search:
         query = query.filter(models.Event.title.ilike(f"%{search}%"))
     
-    return query.order_by(models.Event.start_time).all()
+    events = query.order_by(models.Event.start_time).all()
+
+    # Unmaterialized occurrences are always BUSY
+    if include_occurrences and status in (None, "BUSY"):
+        window_start = start_date or datetime.utcnow()
+        window_end = end_date or window_start + timedelta(days=settings.RECURRENCE_DEFAULT_WINDOW_DAYS)
+        occurrences = [
+            o for o in occurrences_in_window(db, current_user.id, window_start, window_end)
+            if o.start_time >= window_start and o.end_time <= window_end
+            and (not search or search.lower() in o.title.lower())
+        ]
+        if occurrences:
+            events = list(heapq.merge(events, occurrences, key=lambda e: e.start_time))
+
+    if selected:
+        return sparse_response(events, selected)
+    return events
 
 @router.get("/stats", response_model=dict)
 def get_event_stats(
@@ -82,7 +119,7 @@ async def create_event(
     Create a new event with advanced validation:
     - Time slot validation
     - Overlap checking
-    - Automatic conflict detection
+    - Automatic conflict detection (including recurring events)
     """
     # Validate time slot constraints
     validate_time_slot(payload.start_time, payload.end_time)
@@ -93,6 +130,7 @@ async def create_event(
         models.Event.start_time < payload.end_time,
         models.Event.end_time > payload.start_time
     ).all()
+    existing_events += occurrences_in_window(db, current_user.id, payload.start_time, payload.end_time)
     
     if existing_events:
         conflicting_events = [
@@ -117,12 +155,39 @@ async def create_event(
     )
     
     db.add(new_event)
+    db.flush()
+    enqueue(db, "event.changed", action="created", event_id=new_event.id, owner_id=current_user.id)
     db.commit()
     db.refresh(new_event)
     
     return new_event
 
 
+@router.post("/import")
+def import_calendar(
+    file: UploadFile = File(..., description="iCalendar (.ics) file"),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Import events from an iCalendar file as BUSY events.
+    The file is read incrementally and written in batches; the response is
+    newline-delimited JSON with one progress report per batch, the last one
+    having "done": true. Events already imported (same UID) are skipped.
+    """
+    # The upload is closed once this function returns, before the response
+    # streams; a duplicated descriptor keeps the spooled file readable
+    file.file.seek(0)
+    handle = os.fdopen(os.dup(file.file.fileno()), "rb")
+    owner_id = current_user.id
+
+    def progress():
+        with io.TextIOWrapper(handle, encoding="utf-8-sig", errors="replace") as lines:
+            for report in import_events(lines, owner_id):
+                yield json.dumps(report.as_dict()) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
 @router.put("/{event_id}", response_model=schemas.EventOut)
 def update_event(
     event_id: int,
@@ -142,13 +207,21 @@ def update_event(
             detail="Event not found"
         )
 
+    moved_pending = event.status == "SWAP_PENDING" and event.start_time != payload.start_time
+
     # Update event fields
     event.title = payload.title
     event.start_time = payload.start_time
     event.end_time = payload.end_time
     event.status = payload.status or "BUSY"
-    
+
+    # Pending requests on this slot lapse when it starts, so their deadlines move with it
+    rescheduled = refresh_deadlines(db, event) if moved_pending else []
+
+    enqueue(db, "event.changed", action="updated", event_id=event.id, owner_id=current_user.id)
     db.commit()
+    for swap in rescheduled:
+        expiry_scheduler.schedule(swap.id, swap.expires_at)
     db.refresh(event)
     return event
 
@@ -171,6 +244,9 @@ def delete_event(
             detail="Event not found"
         )
 
+    # Cancel the occurrence too, or it would reappear as a virtual one
+    detach_occurrence(db, event)
     db.delete(event)
+    enqueue(db, "event.changed", action="deleted", event_id=event_id, owner_id=current_user.id)
     db.commit()
     return {"message": "Event deleted successfully"}
\ No newline at end of file
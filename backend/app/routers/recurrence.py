@@ -0,0 +1,191 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from app import models, schemas
+from app.core.config import settings
+from app.db import get_db
+from app.deps import get_current_user
+from app.tasks import enqueue
+from app.utils.recurrence import (
+    parse_rrule, format_rrule, series_end, expand, occurrence_starts,
+    occurrences_in_window, find_overlaps,
+)
+from app.utils.time_utils import format_time_slot
+from app.utils.validators import validate_time_slot
+
+router = APIRouter(prefix="/recurrences", tags=["Recurrences"])
+
+
+def _rule_out(rule: models.RecurrenceRule) -> dict:
+    return {
+        "id": rule.id,
+        "title": rule.title,
+        "start_time": rule.dtstart,
+        "end_time": rule.dtstart + timedelta(minutes=rule.duration_minutes),
+        "rrule": format_rrule(rule),
+        "owner_id": rule.owner_id,
+    }
+
+
+def _get_rule(db: Session, rule_id: int, current_user: models.User) -> models.RecurrenceRule:
+    rule = db.query(models.RecurrenceRule).filter(
+        models.RecurrenceRule.id == rule_id,
+        models.RecurrenceRule.owner_id == current_user.id
+    ).first()
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurring event not found")
+    return rule
+
+
+def _require_occurrence(rule: models.RecurrenceRule, occurrence_start: datetime):
+    starts = occurrence_starts(rule, occurrence_start, occurrence_start + timedelta(seconds=1))
+    if occurrence_start not in set(starts):
+        raise HTTPException(status_code=400, detail="No occurrence of this series starts at that time")
+    if any(e.occurrence_start == occurrence_start for e in rule.exceptions):
+        raise HTTPException(status_code=400, detail="This occurrence has been cancelled")
+
+
+@router.get("/", response_model=list[schemas.RecurrenceOut])
+def get_my_recurrences(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Get the recurring event series of the current user"""
+    rules = db.query(models.RecurrenceRule).filter(
+        models.RecurrenceRule.owner_id == current_user.id
+    ).order_by(models.RecurrenceRule.dtstart).all()
+    return [_rule_out(rule) for rule in rules]
+
+
+@router.post("/", response_model=schemas.RecurrenceOut)
+def create_recurrence(
+    payload: schemas.RecurrenceCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Create a recurring event from an RRULE.
+    The series is stored once; occurrences are expanded when read and
+    conflict-checked up to RECURRENCE_CONFLICT_HORIZON_DAYS ahead.
+    """
+    validate_time_slot(payload.start_time, payload.end_time)
+
+    rule = models.RecurrenceRule(
+        title=payload.title,
+        owner_id=current_user.id,
+        dtstart=payload.start_time,
+        duration_minutes=int((payload.end_time - payload.start_time).total_seconds() // 60),
+        **parse_rrule(payload.rrule),
+    )
+    rule.series_end = series_end(rule)
+
+    horizon_end = payload.start_time + timedelta(days=settings.RECURRENCE_CONFLICT_HORIZON_DAYS)
+    if rule.series_end is not None:
+        horizon_end = min(horizon_end, rule.series_end)
+    candidates = list(expand(rule, payload.start_time, horizon_end))
+
+    existing = db.query(models.Event).filter(
+        models.Event.owner_id == current_user.id,
+        models.Event.start_time < horizon_end,
+        models.Event.end_time > payload.start_time
+    ).order_by(models.Event.start_time).all()
+    existing += occurrences_in_window(db, current_user.id, payload.start_time, horizon_end)
+    existing.sort(key=lambda e: e.start_time)
+
+    conflicts = find_overlaps(existing, candidates)
+    if conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Recurring event conflicts with existing events",
+                "conflicts": [f"{e.title} ({format_time_slot(e.start_time, e.end_time)})" for e in conflicts[:20]]
+            }
+        )
+
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    return _rule_out(rule)
+
+
+@router.delete("/{rule_id}")
+def delete_recurrence(
+    rule_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Delete a recurring event; materialized occurrences are kept as standalone events"""
+    rule = _get_rule(db, rule_id, current_user)
+    # Through the ORM, so the change feed sees the events leave the series
+    for event in db.query(models.Event).filter(models.Event.recurrence_id == rule.id):
+        event.recurrence_id = None
+        event.occurrence_start = None
+    db.delete(rule)
+    db.commit()
+    return {"message": "Recurring event deleted successfully"}
+
+
+@router.post("/{rule_id}/exceptions")
+def cancel_occurrence(
+    rule_id: int,
+    payload: schemas.OccurrenceRef,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Skip a single occurrence of a recurring event, deleting it if it was materialized"""
+    rule = _get_rule(db, rule_id, current_user)
+    _require_occurrence(rule, payload.occurrence_start)
+
+    # A materialized occurrence given away in a swap is not the owner's to delete
+    event = db.query(models.Event).filter(
+        models.Event.recurrence_id == rule.id,
+        models.Event.occurrence_start == payload.occurrence_start,
+        models.Event.owner_id == current_user.id
+    ).first()
+    if event:
+        if event.status == "SWAP_PENDING":
+            raise HTTPException(status_code=400, detail="This occurrence has a pending swap request")
+        db.delete(event)
+        enqueue(db, "event.changed", action="deleted", event_id=event.id, owner_id=current_user.id)
+
+    rule.exceptions.append(models.RecurrenceException(occurrence_start=payload.occurrence_start))
+    db.commit()
+    return {"message": "Occurrence cancelled successfully"}
+
+
+@router.post("/{rule_id}/occurrences", response_model=schemas.EventOut)
+def materialize_occurrence(
+    rule_id: int,
+    payload: schemas.OccurrenceMaterialize,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Turn one occurrence into a real event, e.g. to mark it SWAPPABLE.
+    Only materialized occurrences can be listed in the marketplace or swapped.
+    """
+    rule = _get_rule(db, rule_id, current_user)
+    _require_occurrence(rule, payload.occurrence_start)
+
+    existing = db.query(models.Event).filter(
+        models.Event.recurrence_id == rule.id,
+        models.Event.occurrence_start == payload.occurrence_start
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="This occurrence is already an event")
+
+    event = models.Event(
+        title=rule.title,
+        start_time=payload.occurrence_start,
+        end_time=payload.occurrence_start + timedelta(minutes=rule.duration_minutes),
+        status=payload.status or "SWAPPABLE",
+        owner_id=current_user.id,
+        recurrence_id=rule.id,
+        occurrence_start=payload.occurrence_start,
+    )
+    db.add(event)
+    db.flush()
+    enqueue(db, "event.changed", action="created", event_id=event.id, owner_id=current_user.id)
+    db.commit()
+    db.refresh(event)
+    return event
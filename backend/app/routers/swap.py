@@ -1,22 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from typing import Optional
+from datetime import datetime
 from app.db import get_db
+from app.sharding import shard_router
 from app import models, schemas
 from app.deps import get_current_user
+from app.tasks import enqueue
+from app.tasks.expiry import expiry_scheduler, expiry_deadline, expire_requests
+from app.marketplace import marketplace
+from app.utils.recurrence import detach_occurrence
+from app.utils.fields import EVENT_FIELDS, parse_fields, load_event_columns, sparse_response
 
 router = APIRouter(prefix="/swap", tags=["Swap"])
 
+REQUEST_FIELDS = [
+    "id", "status", "requester_name", "requester_email",
+    "responder_name", "responder_email", "my_slot", "their_slot",
+]
+
 
 @router.get("/swappable-slots", response_model=list[schemas.EventOut])
 def get_swappable_slots(
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get all swappable slots from other users (excluding current user's slots)"""
-    slots = db.query(models.Event).filter(
-        models.Event.status == "SWAPPABLE",
-        models.Event.owner_id != current_user.id
-    ).all()
+    """
+    Get all swappable slots from other users (excluding current user's slots),
+    ordered by start time and optionally limited to a date range
+    """
+    selected = parse_fields(fields, EVENT_FIELDS)
+
+    if marketplace.ready:
+        # In-memory read model; see app/marketplace.py
+        slots = marketplace.window(start_date, end_date, exclude_owner=current_user.id)
+    elif shard_router:
+        # Cross-shard: query every shard in parallel and merge by start time
+        statement = select(models.Event).where(
+            models.Event.status == "SWAPPABLE",
+            models.Event.owner_id != current_user.id
+        ).order_by(models.Event.start_time, models.Event.id)
+        if start_date:
+            statement = statement.where(models.Event.start_time >= start_date)
+        if end_date:
+            statement = statement.where(models.Event.end_time <= end_date)
+        if selected:
+            statement = statement.options(load_event_columns(selected, "start_time"))
+        slots = shard_router.fan_out(statement, key=lambda e: (e.start_time, e.id))
+    else:
+        query = db.query(models.Event).filter(
+            models.Event.status == "SWAPPABLE",
+            models.Event.owner_id != current_user.id
+        )
+        if start_date:
+            query = query.filter(models.Event.start_time >= start_date)
+        if end_date:
+            query = query.filter(models.Event.end_time <= end_date)
+        if selected:
+            query = query.options(load_event_columns(selected))
+        slots = query.order_by(models.Event.start_time, models.Event.id).all()
+
+    if selected:
+        return sparse_response(slots, selected)
     return slots
 
 
@@ -56,76 +105,90 @@ def create_swap_request(
         responder_id=their_slot.owner_id,
         my_slot_id=my_slot.id,
         their_slot_id=their_slot.id,
+        expires_at=expiry_deadline(my_slot, their_slot),
     )
 
     db.add(swap)
+    db.flush()
+    enqueue(
+        db, "swap.requested",
+        swap_id=swap.id, requester_id=current_user.id, responder_id=swap.responder_id,
+    )
     db.commit()
     db.refresh(swap)
+    expiry_scheduler.schedule(swap.id, swap.expires_at)
     
     return {"message": "Swap request created successfully", "id": swap.id}
 
 
+def _slot_out(slot: models.Event) -> dict:
+    return {
+        "id": slot.id,
+        "title": slot.title,
+        "start_time": slot.start_time.isoformat(),
+        "end_time": slot.end_time.isoformat(),
+    }
+
+
+def _format_request(req: models.SwapRequest, incoming: bool, fields: list[str]) -> dict:
+    """Build a swap request entry from the perspective of the current user"""
+    if incoming:
+        builders = {
+            "id": lambda: req.id,
+            "status": lambda: req.status.value,
+            "requester_name": lambda: req.requester.name,
+            "requester_email": lambda: req.requester.email,
+            "my_slot": lambda: _slot_out(req.their_slot),
+            "their_slot": lambda: _slot_out(req.my_slot),
+        }
+    else:
+        builders = {
+            "id": lambda: req.id,
+            "status": lambda: req.status.value,
+            "responder_name": lambda: req.responder.name,
+            "responder_email": lambda: req.responder.email,
+            "my_slot": lambda: _slot_out(req.my_slot),
+            "their_slot": lambda: _slot_out(req.their_slot),
+        }
+    return {name: build() for name, build in builders.items() if name in fields}
+
+
+def _request_loaders(fields: list[str], incoming: bool) -> list:
+    """Eager-load only the relationships the requested fields need"""
+    person = models.SwapRequest.requester if incoming else models.SwapRequest.responder
+    loaders = []
+    if any(name.endswith(("_name", "_email")) for name in fields):
+        loaders.append(selectinload(person))
+    if "my_slot" in fields:
+        loaders.append(selectinload(models.SwapRequest.their_slot if incoming else models.SwapRequest.my_slot))
+    if "their_slot" in fields:
+        loaders.append(selectinload(models.SwapRequest.my_slot if incoming else models.SwapRequest.their_slot))
+    return loaders
+
+
 @router.get("/requests")
 def get_swap_requests(
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get all swap requests (incoming and outgoing) for the current user"""
+    selected = parse_fields(fields, REQUEST_FIELDS) or REQUEST_FIELDS
+
     # Get incoming requests (where current user is responder)
-    incoming = db.query(models.SwapRequest).filter(
+    incoming = db.query(models.SwapRequest).options(*_request_loaders(selected, True)).filter(
         models.SwapRequest.responder_id == current_user.id
     ).all()
 
     # Get outgoing requests (where current user is requester)
-    outgoing = db.query(models.SwapRequest).filter(
+    outgoing = db.query(models.SwapRequest).options(*_request_loaders(selected, False)).filter(
         models.SwapRequest.requester_id == current_user.id
     ).all()
 
-    # Format incoming requests with full details
-    incoming_formatted = []
-    for req in incoming:
-        incoming_formatted.append({
-            "id": req.id,
-            "status": req.status.value,
-            "requester_name": req.requester.name,
-            "requester_email": req.requester.email,
-            "my_slot": {
-                "id": req.their_slot.id,
-                "title": req.their_slot.title,
-                "start_time": req.their_slot.start_time.isoformat(),
-                "end_time": req.their_slot.end_time.isoformat(),
-            },
-            "their_slot": {
-                "id": req.my_slot.id,
-                "title": req.my_slot.title,
-                "start_time": req.my_slot.start_time.isoformat(),
-                "end_time": req.my_slot.end_time.isoformat(),
-            }
-        })
-
-    # Format outgoing requests with full details
-    outgoing_formatted = []
-    for req in outgoing:
-        outgoing_formatted.append({
-            "id": req.id,
-            "status": req.status.value,
-            "responder_name": req.responder.name,
-            "responder_email": req.responder.email,
-            "my_slot": {
-                "id": req.my_slot.id,
-                "title": req.my_slot.title,
-                "start_time": req.my_slot.start_time.isoformat(),
-                "end_time": req.my_slot.end_time.isoformat(),
-            },
-            "their_slot": {
-                "id": req.their_slot.id,
-                "title": req.their_slot.title,
-                "start_time": req.their_slot.start_time.isoformat(),
-                "end_time": req.their_slot.end_time.isoformat(),
-            }
-        })
-
-    return {"incoming": incoming_formatted, "outgoing": outgoing_formatted}
+    return {
+        "incoming": [_format_request(req, True, selected) for req in incoming],
+        "outgoing": [_format_request(req, False, selected) for req in outgoing],
+    }
 
 
 @router.post("/swap-response/{request_id}")
@@ -162,12 +225,22 @@ def respond_to_swap(
     if not my_event or not their_event:
         raise HTTPException(status_code=404, detail="One of the slots no longer exists")
 
+    # The scheduler may not have caught up yet; never accept a lapsed request
+    if swap.expires_at is not None and swap.expires_at <= datetime.utcnow():
+        expire_requests(db, [swap])
+        db.commit()
+        raise HTTPException(status_code=400, detail="This request has already been expired")
+
     if payload.accept:
         # ACCEPT: Swap the ownership of the two slots
         temp_owner = my_event.owner_id
         my_event.owner_id = their_event.owner_id
         their_event.owner_id = temp_owner
 
+        # A slot taken from a recurring series leaves it; its new owner has no such series
+        detach_occurrence(db, my_event)
+        detach_occurrence(db, their_event)
+
         # Update statuses
         swap.status = "ACCEPTED"
         my_event.status = "BUSY"
@@ -182,5 +255,16 @@ def respond_to_swap(
 
         message = "Swap rejected successfully"
 
+    if shard_router and payload.accept:
+        # The owners may live on different shards: move each slot to its new
+        # owner's shard and flush both sides before anything is committed
+        my_event = shard_router.relocate(db, my_event)
+        their_event = shard_router.relocate(db, their_event)
+        db.flush()
+
+    enqueue(
+        db, "swap.responded",
+        swap_id=swap.id, status=swap.status, requester_id=swap.requester_id, responder_id=current_user.id,
+    )
     db.commit()
     return {"message": message, "status": swap.status.value}
\ No newline at end of file
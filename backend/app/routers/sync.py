@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+import json
+from app import models
+from app.changefeed import current_watermark, sequence_changes
+from app.db import get_db
+from app.deps import get_current_user
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("")
+def get_changes(
+    since: int = Query(0, ge=0, description="Last sequence number the client has applied"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Changes to the user's events, swap requests and the marketplace after `since`.
+    If `reset` is true the cursor is too old: drop local state and sync from 0.
+    """
+    sequence_changes(db)
+    watermark = current_watermark(db)
+    if 0 < since < watermark:
+        return {"changes": [], "seq": 0, "has_more": True, "reset": True}
+
+    entries = db.query(models.ChangeLogEntry).filter(
+        models.ChangeLogEntry.seq > since,
+        or_(models.ChangeLogEntry.user_id == current_user.id, models.ChangeLogEntry.user_id.is_(None)),
+    ).order_by(models.ChangeLogEntry.seq).limit(limit + 1).all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    return {
+        "changes": [
+            {
+                "seq": entry.seq,
+                "entity": entry.entity,
+                "id": entry.entity_id,
+                "op": entry.op,
+                "data": json.loads(entry.payload) if entry.payload else None,
+            }
+            for entry in entries
+        ],
+        "seq": entries[-1].seq if entries else since,
+        "has_more": has_more,
+        "reset": False,
+    }
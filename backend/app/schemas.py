@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Literal, Optional
 
 
 # ✅ Token Schema for Login Response
@@ -45,13 +45,41 @@ class EventCreate(EventBase):
 
 
 class EventOut(EventBase):
-    id: int
+    # id is None for occurrences of a recurring series that are not materialized yet
+    id: Optional[int] = None
     owner_id: int
+    recurrence_id: Optional[int] = None
+    occurrence_start: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+# ✅ Recurrence Schemas
+class RecurrenceCreate(BaseModel):
+    title: str
+    start_time: datetime
+    end_time: datetime
+    rrule: str = Field(..., examples=["FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"])
+
+
+class RecurrenceOut(BaseModel):
+    id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+    rrule: str
+    owner_id: int
+
+
+class OccurrenceRef(BaseModel):
+    occurrence_start: datetime
+
+
+class OccurrenceMaterialize(OccurrenceRef):
+    status: Optional[str] = "SWAPPABLE"
+
+
 # ✅ Swap Schemas
 class SwapRequestCreate(BaseModel):
     mySlotId: int
@@ -59,4 +87,23 @@ class SwapRequestCreate(BaseModel):
 
 
 class SwapResponse(BaseModel):
-    accept: bool
\ No newline at end of file
+    accept: bool
+
+# ✅ Batch Schemas
+class BatchItem(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., pattern=r"^/", examples=["/events/?status=BUSY"])
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem] = Field(..., min_length=1)
+
+
+class BatchResult(BaseModel):
+    status: int
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchResult]
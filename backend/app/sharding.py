@@ -0,0 +1,305 @@
+"""
+Owner-based horizontal sharding across several databases.
+
+Enabled by listing the shard URLs in ``SHARD_DATABASE_URLS``. A user and
+everything they own (events, recurring series, sent swap requests) live on
+shard ``user_id % N``; bookkeeping tables such as ``task_jobs`` stay on
+shard ``"0"``. Sessions are SQLAlchemy ``ShardedSession`` objects, so the
+routers keep issuing ordinary queries: anything filtered by an owner column
+goes to a single shard and everything else fans out to all of them.
+
+Primary keys are handed out in blocks from a counter table on shard ``"0"``
+so ids stay unique across shards and rows can move between them. Foreign
+keys are not created on shards: a swap request or event may reference rows
+that live on another shard, so referential integrity is left to the
+application.
+"""
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import (
+    create_engine, event, inspect, delete, select, func,
+    MetaData, Table, Column, String, Integer, update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, sessionmaker, MANYTOONE
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+
+from app.core.config import settings
+
+GLOBAL_SHARD = "0"
+
+# Tables that are not owned by a user and always live on the global shard
+GLOBAL_TABLES = {"task_jobs", "change_log", "change_log_pending", "change_log_compactions", "change_log_lock"}
+
+# Column that decides placement for each user-owned table
+ROUTING_COLUMNS = {
+    "users": "id",
+    "events": "owner_id",
+    "recurrence_rules": "owner_id",
+    "swap_requests": "requester_id",
+}
+
+ID_BLOCK_SIZE = 100
+
+_allocator_metadata = MetaData()
+id_blocks = Table(
+    "shard_id_blocks", _allocator_metadata,
+    Column("name", String(100), primary_key=True),
+    Column("next_id", Integer, nullable=False),
+)
+
+
+def shard_metadata(metadata: MetaData) -> MetaData:
+    """Copy of ``metadata`` without foreign key constraints, for creating shard tables"""
+    copy = MetaData()
+    for table in metadata.sorted_tables:
+        table.to_metadata(copy)
+    for table in copy.tables.values():
+        for constraint in list(table.foreign_key_constraints):
+            table.constraints.discard(constraint)
+    return copy
+
+
+def _engine(url: str) -> Engine:
+    return create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+
+
+class IdAllocator:
+    """Hands out primary keys in blocks reserved on the global shard"""
+
+    def __init__(self, router: "ShardRouter"):
+        self.router = router
+        self._blocks: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def next_id(self, table: str) -> int:
+        with self._lock:
+            current, end = self._blocks.get(table, (0, 0))
+            if current >= end:
+                current, end = self._reserve(table)
+            self._blocks[table] = (current + 1, end)
+            return current
+
+    def _reserve(self, table: str) -> tuple[int, int]:
+        engine = self.router.engines[GLOBAL_SHARD]
+        if not self._table_ready:
+            _allocator_metadata.create_all(engine)
+            self._table_ready = True
+        while True:
+            with engine.begin() as conn:
+                # Bump before reading: the UPDATE locks the counter until commit, so
+                # reservations from other processes wait instead of reading the same value
+                bumped = conn.execute(
+                    update(id_blocks).where(id_blocks.c.name == table)
+                    .values(next_id=id_blocks.c.next_id + ID_BLOCK_SIZE)
+                )
+                if bumped.rowcount:
+                    end = conn.execute(select(id_blocks.c.next_id).where(id_blocks.c.name == table)).scalar_one()
+                    return end - ID_BLOCK_SIZE, end
+            start = self.router.max_id(table) + 1
+            try:
+                with engine.begin() as conn:
+                    conn.execute(id_blocks.insert().values(name=table, next_id=start + ID_BLOCK_SIZE))
+                return start, start + ID_BLOCK_SIZE
+            except IntegrityError:
+                # Another process created the counter first; reserve from it instead
+                continue
+
+    def reseed(self):
+        """Move every counter past the largest id currently stored on any shard"""
+        from app.db import Base
+        with self.router.engines[GLOBAL_SHARD].begin() as conn:
+            _allocator_metadata.create_all(conn)
+            for table in Base.metadata.sorted_tables:
+                # Only tables whose single-column key comes from the allocator
+                if table.name in GLOBAL_TABLES or len(table.primary_key.columns) != 1:
+                    continue
+                floor = self.router.max_id(table.name) + 1
+                row = conn.execute(select(id_blocks.c.next_id).where(id_blocks.c.name == table.name)).first()
+                if row is None:
+                    conn.execute(id_blocks.insert().values(name=table.name, next_id=floor))
+                elif row.next_id < floor:
+                    conn.execute(update(id_blocks).where(id_blocks.c.name == table.name).values(next_id=floor))
+        self._blocks.clear()
+
+
+class ShardRouter:
+    def __init__(self, urls: list[str]):
+        self.engines: dict[str, Engine] = {str(i): _engine(url) for i, url in enumerate(urls)}
+        self.allocator = IdAllocator(self)
+        # Two-phase commit where every backend supports it; SQLite commits shard by shard
+        self.twophase = all(e.dialect.name in ("postgresql", "mysql") for e in self.engines.values())
+
+    @property
+    def shard_ids(self) -> list[str]:
+        return list(self.engines)
+
+    def shard_for_user(self, user_id: int) -> str:
+        return str(user_id % len(self.engines))
+
+    def sessionmaker(self) -> sessionmaker:
+        return sessionmaker(
+            class_=ShardedSession,
+            autocommit=False,
+            autoflush=False,
+            shards=self.engines,
+            shard_chooser=self.shard_for_instance,
+            identity_chooser=self._identity_chooser,
+            execute_chooser=self._execute_chooser,
+            twophase=self.twophase,
+        )
+
+    def create_all(self, metadata: MetaData):
+        """Create missing tables on every shard, without cross-shard foreign keys"""
+        owned = shard_metadata(metadata)
+        for engine in self.engines.values():
+            owned.create_all(bind=engine, tables=[t for t in owned.sorted_tables if t.name not in GLOBAL_TABLES])
+        # Global tables reference nothing, so they are created as declared, DDL events included
+        metadata.create_all(
+            bind=self.engines[GLOBAL_SHARD],
+            tables=[t for t in metadata.sorted_tables if t.name in GLOBAL_TABLES],
+        )
+
+    def max_id(self, table: str) -> int:
+        from app.db import Base
+        column, = Base.metadata.tables[table].primary_key.columns
+        highest = 0
+        for engine in self.engines.values():
+            with engine.connect() as conn:
+                highest = max(highest, conn.execute(select(func.max(column))).scalar() or 0)
+        return highest
+
+    # --- choosers -------------------------------------------------------
+
+    def shard_for_instance(self, mapper, instance, clause=None, **kw) -> str:
+        table = mapper.local_table.name
+        if instance is None or table in GLOBAL_TABLES:
+            return GLOBAL_SHARD
+        column = ROUTING_COLUMNS.get(table)
+        if column is not None and getattr(instance, column, None) is not None:
+            return self.shard_for_user(getattr(instance, column))
+        # Child rows (e.g. recurrence exceptions) follow their parent
+        for rel in mapper.relationships:
+            if rel.direction is MANYTOONE:
+                parent = getattr(instance, rel.key, None)
+                if parent is not None:
+                    return self.shard_for_instance(inspect(parent).mapper, parent)
+        return GLOBAL_SHARD
+
+    def _identity_chooser(self, mapper, primary_key, *, lazy_loaded_from, **kw) -> list[str]:
+        if mapper.local_table.name == "users":
+            return [self.shard_for_user(primary_key[0])]
+        if mapper.local_table.name in GLOBAL_TABLES:
+            return [GLOBAL_SHARD]
+        return self.shard_ids
+
+    def _execute_chooser(self, orm_context) -> Iterable[str]:
+        mapper = orm_context.bind_mapper
+        if mapper is not None and mapper.local_table.name in GLOBAL_TABLES:
+            return [GLOBAL_SHARD]
+        user_ids = _routing_values(orm_context.statement, orm_context.parameters or {}, mapper)
+        if user_ids:
+            return sorted({self.shard_for_user(u) for u in user_ids})
+        return self.shard_ids
+
+    # --- cross-shard paths ----------------------------------------------
+
+    def fan_out(self, statement, key: Callable) -> list:
+        """
+        Run an ordered SELECT on every shard concurrently and k-way merge the
+        per-shard results with ``key``. Rows come back detached, loaded.
+        """
+        def run(shard_id: str) -> list:
+            with Session(bind=self.engines[shard_id], expire_on_commit=False) as db:
+                return list(db.scalars(statement))
+
+        with ThreadPoolExecutor(max_workers=len(self.engines)) as pool:
+            parts = list(pool.map(run, self.shard_ids))
+        return list(heapq.merge(*parts, key=key))
+
+    def relocate(self, db: Session, obj):
+        """
+        Move a row to the shard its routing column now points at, inside the
+        session's current transaction. Returns the instance to keep using.
+        """
+        state = inspect(obj)
+        source = state.identity_token
+        target = self.shard_for_instance(state.mapper, obj)
+        if source is None or source == target:
+            return obj
+
+        mapper = state.mapper
+        values = {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+        routing = ROUTING_COLUMNS[mapper.local_table.name]
+        previous = state.attrs[routing].history.deleted
+        if previous:
+            # Lets the change feed tombstone the row for its previous owner
+            db.info.setdefault("relocated_owners", {})[(mapper.local_table.name, values["id"])] = previous[0]
+        db.expunge(obj)
+        # Plain DELETE so the ORM does not null out foreign keys in swap_requests;
+        # shards have no foreign key constraints, so nothing cascades either
+        db.execute(
+            delete(mapper.class_).where(mapper.primary_key[0] == values[mapper.primary_key[0].key]),
+            bind_arguments={"shard_id": source},
+        )
+        clone = mapper.class_(**values)
+        db.add(clone)
+        return clone
+
+
+def _conjuncts(clause) -> list:
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        return [c for sub in clause.clauses for c in _conjuncts(sub)]
+    return [clause] if clause is not None else []
+
+
+def _bind_value(bind: BindParameter, parameters: dict):
+    value = bind.effective_value
+    if value is None and bind.key in parameters:
+        value = parameters[bind.key]
+    return value
+
+
+def _routing_values(statement, parameters: dict, mapper) -> set[int]:
+    """
+    User ids a statement is restricted to, taken from ``routing column ==``
+    or ``IN`` terms on its main table that are ANDed at the top of its WHERE clause
+    """
+    if mapper is None:
+        return set()
+    table = mapper.local_table
+    column = ROUTING_COLUMNS.get(table.name)
+    values: set[int] = set()
+    for term in _conjuncts(getattr(statement, "whereclause", None)):
+        if not isinstance(term, BinaryExpression) or not isinstance(term.right, BindParameter):
+            continue
+        if getattr(term.left, "table", None) is not table or term.left.key != column:
+            continue
+        value = _bind_value(term.right, parameters)
+        if term.operator is operators.eq and value is not None:
+            values.add(int(value))
+        elif term.operator is operators.in_op and value:
+            values.update(int(v) for v in value)
+    return values
+
+
+@event.listens_for(ShardedSession, "before_flush")
+def _assign_global_ids(session: ShardedSession, flush_context, instances):
+    for obj in session.new:
+        mapper = inspect(obj).mapper
+        # Global tables live on one shard and keep their own autoincrement
+        if mapper.local_table.name in GLOBAL_TABLES:
+            continue
+        if len(mapper.primary_key) == 1 and getattr(obj, mapper.primary_key[0].key) is None:
+            setattr(obj, mapper.primary_key[0].key, shard_router.allocator.next_id(mapper.local_table.name))
+
+
+# Global instance (None when sharding is disabled)
+shard_router: Optional[ShardRouter] = ShardRouter(settings.SHARD_DATABASE_URLS) if settings.SHARD_DATABASE_URLS else None
@@ -0,0 +1,7 @@
+"""
+Background task queue for work that should run after a write commits.
+"""
+from app.tasks.queue import task, enqueue, task_queue
+from app.tasks import handlers  # noqa: F401  (registers the built-in handlers)
+
+__all__ = ['task', 'enqueue', 'task_queue']
@@ -0,0 +1,170 @@
+"""
+Expiry of stale pending swap requests.
+
+Each pending request carries an indexed ``expires_at``: the earlier of its
+TTL and the start of either slot. An in-memory heap holds the deadlines
+due within the next ``horizon`` and is refilled from that column, so the
+scheduler recovers after a restart and never holds the whole table in
+memory. Due requests are expired in batched transactions that return both
+slots to SWAPPABLE.
+"""
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+
+from app import models
+from app.core.config import settings
+from app.db import SessionLocal
+from app.tasks.queue import enqueue
+
+logger = logging.getLogger(__name__)
+
+# Wait before retrying a failed load of deadlines from the database
+REFILL_RETRY_SECONDS = 5
+
+
+def _utc_naive(value: datetime) -> datetime:
+    # Start times set from a request body may still carry their offset
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def expiry_deadline(my_slot: models.Event, their_slot: models.Event, now: Optional[datetime] = None) -> datetime:
+    """When a new request between the two slots should lapse"""
+    now = now or datetime.utcnow()
+    ttl = now + timedelta(minutes=settings.SWAP_REQUEST_TTL_MINUTES)
+    return min(ttl, _utc_naive(my_slot.start_time), _utc_naive(their_slot.start_time))
+
+
+def refresh_deadlines(db: Session, slot: models.Event) -> list[models.SwapRequest]:
+    """Recompute ``expires_at`` of the pending requests on a slot whose start moved; the caller commits"""
+    swaps = db.query(models.SwapRequest).filter(
+        models.SwapRequest.status == models.RequestStatus.PENDING,
+        or_(models.SwapRequest.my_slot_id == slot.id, models.SwapRequest.their_slot_id == slot.id),
+    ).all()
+    for swap in swaps:
+        swap.expires_at = expiry_deadline(swap.my_slot, swap.their_slot, swap.created_at)
+    return swaps
+
+
+def expire_requests(db: Session, swaps: list[models.SwapRequest]):
+    """Mark requests EXPIRED and release their slots; the caller commits"""
+    for swap in swaps:
+        swap.status = "EXPIRED"
+        for slot in (swap.my_slot, swap.their_slot):
+            if slot is not None and slot.status == "SWAP_PENDING":
+                slot.status = "SWAPPABLE"
+        enqueue(
+            db, "swap.expired",
+            swap_id=swap.id, requester_id=swap.requester_id, responder_id=swap.responder_id,
+        )
+
+
+class ExpiryScheduler:
+    def __init__(self, session_factory=SessionLocal, batch_size: int = 200,
+                 horizon: timedelta = timedelta(minutes=10)):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.horizon = horizon
+        self._heap: list[tuple[datetime, int]] = []
+        self._lock = threading.Lock()
+        self._loaded_until: Optional[datetime] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, request_id: int, expires_at: datetime):
+        """Track a new deadline; safe to call from request threads"""
+        with self._lock:
+            # Later deadlines are picked up by the next refill from the database
+            if self._loaded_until is None or expires_at > self._loaded_until:
+                return
+            heapq.heappush(self._heap, (expires_at, request_id))
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            now = datetime.utcnow()
+            if self._loaded_until is None or now >= self._loaded_until - self.horizon / 2:
+                try:
+                    await asyncio.to_thread(self._refill, now)
+                except Exception:
+                    logger.exception("Failed to load swap request deadlines")
+                    await asyncio.sleep(REFILL_RETRY_SECONDS)
+                    continue
+
+            due = self._pop_due(now)
+            for start in range(0, len(due), self.batch_size):
+                try:
+                    await asyncio.to_thread(self._expire_batch, due[start:start + self.batch_size])
+                except Exception:
+                    logger.exception("Failed to expire swap requests")
+
+            with self._lock:
+                next_deadline = self._heap[0][0] if self._heap else self._loaded_until
+            delay = (min(next_deadline, self._loaded_until - self.horizon / 2) - datetime.utcnow()).total_seconds()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(delay, 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    def _refill(self, now: datetime):
+        """Load every pending deadline up to now + horizon from the indexed column"""
+        until = now + self.horizon
+        with self.session_factory() as db:
+            rows = db.query(models.SwapRequest.expires_at, models.SwapRequest.id).filter(
+                models.SwapRequest.status == models.RequestStatus.PENDING,
+                models.SwapRequest.expires_at.is_not(None),
+                models.SwapRequest.expires_at <= until,
+            ).all()
+        with self._lock:
+            # Keep entries scheduled while the query ran
+            self._heap = list({(expires_at, request_id) for expires_at, request_id in rows} | set(self._heap))
+            heapq.heapify(self._heap)
+            self._loaded_until = until
+
+    def _pop_due(self, now: datetime) -> list[int]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def _expire_batch(self, request_ids: list[int]):
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            # Re-check state: the responder may have answered in the meantime
+            swaps = db.query(models.SwapRequest).options(
+                selectinload(models.SwapRequest.my_slot),
+                selectinload(models.SwapRequest.their_slot),
+            ).filter(
+                models.SwapRequest.id.in_(request_ids),
+                models.SwapRequest.status == models.RequestStatus.PENDING,
+                models.SwapRequest.expires_at <= now,
+            ).all()
+            if swaps:
+                expire_requests(db, swaps)
+                db.commit()
+                logger.info("Expired %d swap requests", len(swaps))
+
+
+# Global instance
+expiry_scheduler = ExpiryScheduler(batch_size=settings.SWAP_EXPIRY_BATCH_SIZE)
@@ -0,0 +1,45 @@
+"""
+Built-in handlers for post-commit side effects of event and swap writes.
+"""
+import logging
+
+from app.tasks.queue import task
+
+notification_logger = logging.getLogger("app.notifications")
+audit_logger = logging.getLogger("app.audit")
+
+
+@task("swap.requested")
+def notify_swap_requested(payload: dict):
+    """Tell the responder that someone wants one of their slots"""
+    notification_logger.info(
+        "User %s requested swap %s with user %s",
+        payload["requester_id"], payload["swap_id"], payload["responder_id"],
+    )
+    audit_logger.info("swap.requested %s", payload)
+
+
+@task("swap.responded")
+def notify_swap_responded(payload: dict):
+    """Tell the requester how their swap request was answered"""
+    notification_logger.info(
+        "Swap %s was %s by user %s",
+        payload["swap_id"], payload["status"].lower(), payload["responder_id"],
+    )
+    audit_logger.info("swap.responded %s", payload)
+
+
+@task("swap.expired")
+def notify_swap_expired(payload: dict):
+    """Tell both sides that an unanswered request lapsed and the slots are free again"""
+    notification_logger.info(
+        "Swap %s between users %s and %s expired",
+        payload["swap_id"], payload["requester_id"], payload["responder_id"],
+    )
+    audit_logger.info("swap.expired %s", payload)
+
+
+@task("event.changed")
+def audit_event_change(payload: dict):
+    """Record event creation, updates and deletion"""
+    audit_logger.info("event.%s %s", payload["action"], payload)
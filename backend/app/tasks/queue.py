@@ -0,0 +1,301 @@
+"""
+Background job queue for post-commit side effects.
+
+Jobs are staged on a SQLAlchemy session with ``enqueue`` and only reach the
+workers once that session commits; a rollback discards them. Two backends
+are available:
+
+- ``memory``: jobs are handed to an in-process asyncio queue after commit.
+- ``db``: jobs are inserted into the ``task_jobs`` table in the same
+  transaction as the domain write, so they survive a restart.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import event, and_, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+from app.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Registered task handlers, keyed by job name
+_handlers: dict[str, Callable[[dict], None]] = {}
+
+# How long a claimed job in the durable queue stays invisible to other workers
+LEASE_SECONDS = 300
+
+# Pause before a worker retries after the backend itself failed
+WORKER_RETRY_SECONDS = 5
+
+
+def task(name: str):
+    """Register a handler for jobs with the given name"""
+    def decorator(fn: Callable[[dict], None]):
+        _handlers[name] = fn
+        return fn
+    return decorator
+
+
+@dataclass
+class Job:
+    name: str
+    payload: dict
+    attempts: int = 0
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff in seconds, capped at five minutes"""
+    return min(2 ** attempts, 300)
+
+
+class MemoryBackend:
+    """In-process queue; jobs are lost if the process exits before they run"""
+
+    def __init__(self):
+        self._ready: deque[Job] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        if self._ready:
+            self._wakeup.set()
+
+    def stage(self, db: Session, job: Job):
+        # Open the transaction now, or a rollback before any write would not discard the job
+        if not db.in_transaction():
+            db.begin()
+        db.info.setdefault("task_jobs", []).append(job)
+
+    def push(self, jobs: list[Job]):
+        # Called from after_commit, which may run in a threadpool thread
+        self._ready.extend(jobs)
+        self._notify()
+
+    def _notify(self):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def fetch_batch(self, size: int) -> list[Job]:
+        while not self._ready:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.TASK_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        batch = []
+        while self._ready and len(batch) < size:
+            batch.append(self._ready.popleft())
+        return batch
+
+    async def complete(self, jobs: list[Job]):
+        pass
+
+    async def retry(self, jobs: list[Job]):
+        for job in jobs:
+            self._loop.call_later(retry_delay(job.attempts), self.push, [job])
+
+    async def fail(self, jobs: list[Job]):
+        for job in jobs:
+            logger.error("Task %s dropped after %d attempts", job.name, job.attempts)
+
+
+class DatabaseBackend:
+    """Durable queue stored in the ``task_jobs`` table of the app database"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        # Pick up anything left over from a previous run straight away
+        self._wakeup.set()
+
+    def stage(self, db: Session, job: Job):
+        # Inserted alongside the domain rows, so it commits or rolls back with them
+        db.add(models.TaskJob(name=job.name, payload=json.dumps(job.payload)))
+        db.info["task_jobs_staged"] = True
+
+    def push(self, jobs: list[Job]):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def fetch_batch(self, size: int) -> list[Job]:
+        while True:
+            batch = await asyncio.to_thread(self._claim, size)
+            if batch:
+                return batch
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.TASK_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim(self, size: int) -> list[Job]:
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=LEASE_SECONDS)
+        claimable = and_(
+            models.TaskJob.status.in_([models.JobStatus.PENDING, models.JobStatus.RUNNING]),
+            models.TaskJob.run_at <= now,
+        )
+        with self.session_factory() as db:
+            ids = [
+                row[0] for row in db.query(models.TaskJob.id)
+                .filter(claimable)
+                .order_by(models.TaskJob.id)
+                .limit(size)
+                .all()
+            ]
+            if not ids:
+                return []
+            # The lease timestamp doubles as a claim token between competing workers
+            db.execute(
+                update(models.TaskJob)
+                .where(models.TaskJob.id.in_(ids), claimable)
+                .values(status=models.JobStatus.RUNNING, run_at=lease)
+            )
+            db.commit()
+            rows = db.query(models.TaskJob).filter(
+                models.TaskJob.id.in_(ids),
+                models.TaskJob.status == models.JobStatus.RUNNING,
+                models.TaskJob.run_at == lease,
+            ).all()
+            return [Job(r.name, json.loads(r.payload), r.attempts, r.id) for r in rows]
+
+    async def complete(self, jobs: list[Job]):
+        if jobs:
+            await asyncio.to_thread(self._delete, [job.id for job in jobs])
+
+    def _delete(self, ids: list[int]):
+        with self.session_factory() as db:
+            db.query(models.TaskJob).filter(models.TaskJob.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+
+    async def retry(self, jobs: list[Job]):
+        if jobs:
+            await asyncio.to_thread(self._reschedule, jobs, models.JobStatus.PENDING)
+
+    async def fail(self, jobs: list[Job]):
+        if jobs:
+            await asyncio.to_thread(self._reschedule, jobs, models.JobStatus.FAILED)
+
+    def _reschedule(self, jobs: list[Job], status: models.JobStatus):
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            for job in jobs:
+                db.execute(
+                    update(models.TaskJob)
+                    .where(models.TaskJob.id == job.id)
+                    .values(
+                        status=status,
+                        attempts=job.attempts,
+                        run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+                        last_error=job.error,
+                    )
+                )
+            db.commit()
+
+
+class TaskQueue:
+    """Pool of asyncio workers draining a backend in batches"""
+
+    def __init__(self, backend, workers: int, batch_size: int, max_attempts: int):
+        self.backend = backend
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._tasks: list[asyncio.Task] = []
+
+    def enqueue(self, db: Session, name: str, **payload):
+        """Stage a job that runs only after ``db`` commits"""
+        self.backend.stage(db, Job(name, payload))
+
+    async def start(self):
+        self.backend.bind(asyncio.get_running_loop())
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                batch = await self.backend.fetch_batch(self.batch_size)
+            except Exception:
+                logger.exception("Worker %d failed to fetch jobs", index)
+                await asyncio.sleep(WORKER_RETRY_SECONDS)
+                continue
+
+            done, retry, failed = [], [], []
+            for job in batch:
+                handler = _handlers.get(job.name)
+                job.attempts += 1
+                start = time.time()
+                try:
+                    if handler is None:
+                        raise LookupError(f"No handler registered for task '{job.name}'")
+                    await asyncio.to_thread(handler, job.payload)
+                    done.append(job)
+                except Exception as exc:
+                    job.error = repr(exc)
+                    logger.warning("Task %s failed (attempt %d): %r", job.name, job.attempts, exc)
+                    (failed if job.attempts >= self.max_attempts else retry).append(job)
+                logger.debug("Worker %d ran %s in %.3fs", index, job.name, time.time() - start)
+            try:
+                await self.backend.complete(done)
+                await self.backend.retry(retry)
+                await self.backend.fail(failed)
+            except Exception:
+                # Durable jobs run again once their lease expires
+                logger.exception("Worker %d failed to record job results", index)
+                await asyncio.sleep(WORKER_RETRY_SECONDS)
+
+
+def _build_backend():
+    if settings.TASK_QUEUE_BACKEND == "db":
+        return DatabaseBackend()
+    if settings.TASK_QUEUE_BACKEND == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown TASK_QUEUE_BACKEND: {settings.TASK_QUEUE_BACKEND}")
+
+
+@event.listens_for(Session, "after_commit")
+def _release_staged_jobs(session: Session):
+    jobs = session.info.pop("task_jobs", None)
+    staged = session.info.pop("task_jobs_staged", False)
+    if jobs or staged:
+        task_queue.backend.push(jobs or [])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_staged_jobs(session: Session, previous_transaction):
+    session.info.pop("task_jobs", None)
+    session.info.pop("task_jobs_staged", None)
+
+
+# Global instances
+task_queue = TaskQueue(
+    _build_backend(),
+    workers=settings.TASK_WORKERS,
+    batch_size=settings.TASK_BATCH_SIZE,
+    max_attempts=settings.TASK_MAX_ATTEMPTS,
+)
+enqueue = task_queue.enqueue
@@ -0,0 +1,42 @@
+"""
+Sparse fieldsets for list endpoints.
+
+``?fields=id,title,start_time`` limits both the columns loaded from the
+database and the keys in the serialized output.
+"""
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only
+from typing import Optional, Iterable
+from app import models, schemas
+
+EVENT_FIELDS = list(schemas.EventOut.model_fields)
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[list[str]]:
+    """
+    Parse a comma-separated ``fields`` parameter
+    :return: requested names in their canonical order, or None for all fields
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}"
+        )
+    return [name for name in allowed if name in requested]
+
+
+def load_event_columns(fields: list[str], *always: str):
+    """Loader option restricting an Event query to the requested columns"""
+    names = set(fields) | set(always)
+    return load_only(*[getattr(models.Event, name) for name in EVENT_FIELDS if name in names])
+
+
+def sparse_response(items: Iterable, fields: list[str]) -> JSONResponse:
+    """Serialize only the requested attributes of each item"""
+    return JSONResponse(content=jsonable_encoder([{name: getattr(item, name) for name in fields} for item in items]))
@@ -0,0 +1,272 @@
+"""
+RRULE-style recurrence rules, expanded lazily within a time window.
+
+Only the subset the app needs is supported: ``FREQ=DAILY|WEEKLY`` with
+``INTERVAL``, ``BYDAY`` (weekly only) and one of ``COUNT`` / ``UNTIL``.
+Expansion jumps straight to the first period touching the window, so the
+cost depends on the size of the window rather than the age of the series.
+"""
+from fastapi import HTTPException
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+from app import models
+
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+@dataclass
+class Occurrence:
+    """A not-yet-materialized occurrence of a recurring event"""
+    title: str
+    start_time: datetime
+    end_time: datetime
+    owner_id: int
+    recurrence_id: int
+    status: str = "BUSY"
+    id: Optional[int] = None
+
+    @property
+    def occurrence_start(self) -> datetime:
+        return self.start_time
+
+
+def parse_rrule(rrule: str) -> dict:
+    """
+    Parse an RRULE string such as ``FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10``
+    :return: dict with freq, interval, by_weekday, count and until
+    """
+    parts = {}
+    for item in rrule.strip().removeprefix("RRULE:").split(";"):
+        if not item:
+            continue
+        name, _, value = item.partition("=")
+        parts[name.strip().upper()] = value.strip().upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in ("DAILY", "WEEKLY"):
+        raise HTTPException(status_code=400, detail="FREQ must be DAILY or WEEKLY")
+
+    try:
+        interval = int(parts.pop("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+        until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid INTERVAL, COUNT or UNTIL value")
+    parts.pop("COUNT", None)
+    parts.pop("UNTIL", None)
+
+    if interval < 1 or (count is not None and count < 1):
+        raise HTTPException(status_code=400, detail="INTERVAL and COUNT must be positive")
+    if count is not None and until is not None:
+        raise HTTPException(status_code=400, detail="COUNT and UNTIL cannot both be set")
+
+    by_weekday = None
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise HTTPException(status_code=400, detail="BYDAY is only supported with FREQ=WEEKLY")
+        days = [d for d in parts.pop("BYDAY").split(",") if d]
+        if not days or any(d not in WEEKDAY_CODES for d in days):
+            raise HTTPException(status_code=400, detail="BYDAY must list weekdays such as MO,TU")
+        by_weekday = ",".join(sorted(set(days), key=WEEKDAY_CODES.index))
+
+    if parts:
+        raise HTTPException(status_code=400, detail=f"Unsupported RRULE parts: {', '.join(sorted(parts))}")
+
+    return {"freq": freq, "interval": interval, "by_weekday": by_weekday, "count": count, "until": until}
+
+
+def _parse_until(value: str) -> datetime:
+    value = value.rstrip("Z")
+    if "T" in value:
+        return datetime.strptime(value, "%Y%m%dT%H%M%S")
+    return datetime.strptime(value, "%Y%m%d").replace(hour=23, minute=59, second=59)
+
+
+def format_rrule(rule) -> str:
+    """Render a stored rule back into RRULE syntax"""
+    parts = [f"FREQ={_freq(rule)}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.by_weekday:
+        parts.append(f"BYDAY={rule.by_weekday}")
+    if rule.count is not None:
+        parts.append(f"COUNT={rule.count}")
+    if rule.until is not None:
+        parts.append(f"UNTIL={rule.until.strftime('%Y%m%dT%H%M%S')}")
+    return ";".join(parts)
+
+
+def _freq(rule) -> str:
+    return getattr(rule.freq, "value", rule.freq)
+
+
+def _weekdays(rule) -> list[int]:
+    if rule.by_weekday:
+        return [WEEKDAY_CODES.index(d) for d in rule.by_weekday.split(",")]
+    return [rule.dtstart.weekday()]
+
+
+def occurrence_starts(rule, window_start: datetime, window_end: datetime) -> Iterator[datetime]:
+    """
+    Yield start times of occurrences that overlap ``[window_start, window_end)``
+    """
+    duration = timedelta(minutes=rule.duration_minutes)
+    # An occurrence overlaps the window iff it starts after this and before window_end
+    earliest = window_start - duration
+
+    if _freq(rule) == "DAILY":
+        step = timedelta(days=rule.interval)
+        index = max(0, (earliest - rule.dtstart) // step + 1)
+        start = rule.dtstart + index * step
+        while start < window_end:
+            if rule.count is not None and index >= rule.count:
+                return
+            if rule.until is not None and start > rule.until:
+                return
+            yield start
+            index += 1
+            start += step
+        return
+
+    # WEEKLY: walk whole periods anchored on the Monday of the first week
+    days = _weekdays(rule)
+    period = timedelta(weeks=rule.interval)
+    anchor = rule.dtstart - timedelta(days=rule.dtstart.weekday())
+    skipped_first_week = sum(1 for d in days if d < rule.dtstart.weekday())
+    week = max(0, (earliest - anchor) // period)
+    while True:
+        week_start = anchor + week * period
+        if week_start >= window_end:
+            return
+        for position, day in enumerate(days):
+            start = week_start + timedelta(days=day)
+            if start < rule.dtstart:
+                continue
+            if rule.count is not None and week * len(days) + position - skipped_first_week >= rule.count:
+                return
+            if rule.until is not None and start > rule.until:
+                return
+            if start >= window_end:
+                return
+            if start > earliest:
+                yield start
+        week += 1
+
+
+def series_end(rule) -> Optional[datetime]:
+    """End of the last occurrence, or None for open-ended series"""
+    duration = timedelta(minutes=rule.duration_minutes)
+    if rule.until is not None:
+        # The last start lies within one period (plus a week of BYDAY days) of UNTIL
+        period = timedelta(days=rule.interval) if _freq(rule) == "DAILY" else timedelta(weeks=rule.interval + 1)
+        last = None
+        for last in occurrence_starts(rule, rule.until - period, rule.until + timedelta(seconds=1)):
+            pass
+        return (last or rule.dtstart) + duration
+    if rule.count is None:
+        return None
+    if _freq(rule) == "DAILY":
+        return rule.dtstart + (rule.count - 1) * timedelta(days=rule.interval) + duration
+    days = _weekdays(rule)
+    index = rule.count - 1 + sum(1 for d in days if d < rule.dtstart.weekday())
+    anchor = rule.dtstart - timedelta(days=rule.dtstart.weekday())
+    week, position = divmod(index, len(days))
+    return anchor + week * timedelta(weeks=rule.interval) + timedelta(days=days[position]) + duration
+
+
+def expand(rule, window_start: datetime, window_end: datetime,
+           skip: set[datetime] = frozenset()) -> Iterator[Occurrence]:
+    """
+    Yield virtual occurrences of ``rule`` overlapping the window
+    :param skip: occurrence starts that are cancelled or already materialized
+    """
+    duration = timedelta(minutes=rule.duration_minutes)
+    for start in occurrence_starts(rule, window_start, window_end):
+        if start in skip:
+            continue
+        yield Occurrence(
+            title=rule.title,
+            start_time=start,
+            end_time=start + duration,
+            owner_id=rule.owner_id,
+            recurrence_id=rule.id,
+        )
+
+
+def detach_occurrence(db: Session, event: models.Event):
+    """
+    Cut a materialized occurrence loose from its series, cancelling it there
+    so it does not come back as a virtual occurrence; the caller commits
+    """
+    if event.recurrence_id is None:
+        return
+    rule = db.get(models.RecurrenceRule, event.recurrence_id)
+    if rule is not None and all(x.occurrence_start != event.occurrence_start for x in rule.exceptions):
+        rule.exceptions.append(models.RecurrenceException(occurrence_start=event.occurrence_start))
+    event.recurrence_id = None
+    event.occurrence_start = None
+
+
+def occurrences_in_window(db: Session, owner_id: int, window_start: datetime,
+                          window_end: datetime) -> list[Occurrence]:
+    """
+    Virtual occurrences of all of a user's series overlapping the window,
+    excluding cancelled and materialized ones, sorted by start time
+    """
+    rules = (
+        db.query(models.RecurrenceRule)
+        .options(selectinload(models.RecurrenceRule.exceptions))
+        .filter(
+            models.RecurrenceRule.owner_id == owner_id,
+            models.RecurrenceRule.dtstart < window_end,
+            or_(models.RecurrenceRule.series_end.is_(None),
+                models.RecurrenceRule.series_end > window_start),
+        )
+        .all()
+    )
+    if not rules:
+        return []
+
+    materialized = (
+        db.query(models.Event.recurrence_id, models.Event.occurrence_start)
+        .filter(
+            models.Event.recurrence_id.in_([rule.id for rule in rules]),
+            models.Event.occurrence_start < window_end,
+            models.Event.occurrence_start > window_start - timedelta(days=1),
+        )
+        .all()
+    )
+    skipped: dict[int, set[datetime]] = {rule.id: {e.occurrence_start for e in rule.exceptions} for rule in rules}
+    for recurrence_id, occurrence_start in materialized:
+        skipped[recurrence_id].add(occurrence_start)
+
+    occurrences = [
+        occurrence
+        for rule in rules
+        for occurrence in expand(rule, window_start, window_end, skipped[rule.id])
+    ]
+    occurrences.sort(key=lambda o: o.start_time)
+    return occurrences
+
+
+def find_overlaps(existing: list, candidates: list) -> list:
+    """
+    Items of ``existing`` overlapping any of ``candidates``.
+
+    Both lists must be sorted by start time and all candidates must share the
+    same duration (true for occurrences of one series), which keeps their end
+    times sorted too and lets a single forward pass do the check.
+    """
+    conflicts = []
+    j = 0
+    for item in existing:
+        while j < len(candidates) and candidates[j].end_time <= item.start_time:
+            j += 1
+        if j == len(candidates):
+            break
+        if candidates[j].start_time < item.end_time:
+            conflicts.append(item)
+    return conflicts
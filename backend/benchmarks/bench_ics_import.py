@@ -0,0 +1,87 @@
+"""
+Throughput and memory of the streaming iCalendar import.
+
+Generates a synthetic .ics file, then measures parsing alone and the full
+import into the database, reporting events per second and peak Python
+heap use (which should not grow with file size).
+
+    python -m benchmarks.bench_ics_import [--events 100000] [--batch-size 500]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.common import _tmpdir, seed
+from app.core.security import decode_token
+from app.ical_import import import_events
+from app.utils.ical import iter_events
+
+
+def write_ics(path: str, events: int):
+    start = datetime(2031, 1, 1, 8)
+    with open(path, "w", newline="") as out:
+        out.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//SlotSwapper//bench//EN\r\n")
+        for i in range(events):
+            begin = start + timedelta(hours=2 * i)
+            out.write(
+                "BEGIN:VEVENT\r\n"
+                f"UID:bench-{i}@slotswapper.test\r\n"
+                f"DTSTART:{begin:%Y%m%dT%H%M%SZ}\r\n"
+                f"DTEND:{begin + timedelta(minutes=60):%Y%m%dT%H%M%SZ}\r\n"
+                f"SUMMARY:Imported meeting {i} with a description long enough to need\r\n"
+                " folding onto a continuation line\r\n"
+                "BEGIN:VALARM\r\nTRIGGER:-PT15M\r\nACTION:DISPLAY\r\nEND:VALARM\r\n"
+                "END:VEVENT\r\n"
+            )
+        out.write("END:VCALENDAR\r\n")
+
+
+def timed_run(fn, trace: bool):
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = 0.0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    path = os.path.join(_tmpdir, "bench.ics")
+    write_ics(path, args.events)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    # Two owners: one imported at full speed, one under tracemalloc
+    owners = [int(decode_token(h["Authorization"].split()[1])["sub"]) for h in seed(2, 0)]
+
+    def parse():
+        with open(path) as lines:
+            return sum(1 for _ in iter_events(lines))
+
+    def run_import(owner_id):
+        def run():
+            with open(path) as lines:
+                for report in import_events(lines, owner_id, batch_size=args.batch_size):
+                    pass
+            return report.imported
+        return run
+
+    print(f"{args.events} events, {size_mb:.1f} MB file\n")
+    print(f"{'phase':<12}{'count':>10}{'seconds':>10}{'events/s':>12}{'peak MB':>10}")
+    for name, fn in (("parse only", parse), ("import", run_import(owners[0])), ("re-import", run_import(owners[0]))):
+        count, elapsed, _ = timed_run(fn, trace=False)
+        _, _, peak = timed_run(fn if name == "parse only" else run_import(owners[1]), trace=True)
+        print(f"{name:<12}{count:>10}{elapsed:>10.2f}{args.events / elapsed:>12,.0f}{peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Marketplace reads from the in-memory read model versus the SQL path, both
+for the lookup alone and end to end through GET /swap/swappable-slots.
+
+    python -m benchmarks.bench_marketplace [--users 200] [--events 50]
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import seed, timed, client
+from app import models
+from app.core.security import decode_token
+from app.db import SessionLocal
+from app.marketplace import marketplace
+
+
+def sql_window(user_id: int, start: datetime | None, end: datetime | None) -> list:
+    with SessionLocal() as db:
+        query = db.query(models.Event).filter(
+            models.Event.status == "SWAPPABLE",
+            models.Event.owner_id != user_id,
+        )
+        if start:
+            query = query.filter(models.Event.start_time >= start)
+        if end:
+            query = query.filter(models.Event.end_time <= end)
+        return query.order_by(models.Event.start_time, models.Event.id).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    headers = seed(args.users, args.events)[0]
+    me = int(decode_token(headers["Authorization"].split()[1])["sub"])
+    day = datetime(2030, 1, 2)
+    windows = [
+        ("all", None, None),
+        ("one day", day, day + timedelta(days=1)),
+    ]
+
+    with client() as c:
+        print(f"{len(marketplace.window())} listed slots\n")
+
+        print(f"{'lookup':<10}{'window':<10}{'rows':>7}{'median ms':>11}{'p95 ms':>9}")
+        for label, start, end in windows:
+            rows = len(marketplace.window(start, end, exclude_owner=me))
+            for name, fn in (
+                ("memory", lambda: marketplace.window(start, end, exclude_owner=me)),
+                ("sql", lambda: sql_window(me, start, end)),
+            ):
+                median, p95 = timed(fn, args.repeat)
+                print(f"{name:<10}{label:<10}{rows:>7}{median:>11.3f}{p95:>9.3f}")
+
+        print(f"\n{'endpoint':<10}{'window':<10}{'median ms':>18}{'p95 ms':>9}")
+        for label, start, end in windows:
+            params = {k: v.isoformat() for k, v in (("start_date", start), ("end_date", end)) if v}
+            for name, ready in (("memory", True), ("sql", False)):
+                marketplace.ready = ready
+                median, p95 = timed(lambda: c.get("/swap/swappable-slots", params=params, headers=headers), args.repeat)
+                print(f"{name:<10}{label:<10}{median:>18.2f}{p95:>9.2f}")
+        marketplace.ready = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Payload size and latency of large marketplace and request lists with and
+without sparse fieldsets and response compression.
+
+    python -m benchmarks.bench_payloads [--users 200] [--events 50]
+"""
+import argparse
+
+from benchmarks.common import seed, timed, client
+from app.middleware import compression
+
+ENCODINGS = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    headers = seed(args.users, args.events, requests=args.requests)[0]
+    cases = [
+        ("/swap/swappable-slots", None),
+        ("/swap/swappable-slots", "id,start_time,end_time"),
+        ("/swap/requests", None),
+        ("/swap/requests", "id,status,their_slot"),
+    ]
+
+    print(f"{'endpoint':<24}{'fields':<26}{'encoding':<10}{'bytes':>10}{'median ms':>11}{'p95 ms':>9}")
+    with client() as c:
+        for path, fields in cases:
+            params = {"fields": fields} if fields else {}
+            for encoding in ENCODINGS:
+                h = dict(headers, **{"Accept-Encoding": encoding})
+                response = c.get(path, params=params, headers=h)
+                response.raise_for_status()
+                wire_size = len(response.content) if response.headers.get("content-encoding") is None \
+                    else int(response.headers.get("content-length", 0))
+                applied = response.headers.get("content-encoding", "identity")
+                median, p95 = timed(lambda: c.get(path, params=params, headers=h), args.repeat)
+                print(f"{path:<24}{fields or '(all)':<26}{applied:<10}{wire_size:>10}{median:>11.2f}{p95:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
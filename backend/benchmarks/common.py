@@ -0,0 +1,81 @@
+"""
+Shared setup for the benchmarks: a throwaway SQLite database seeded with
+users and events, and a TestClient driving the full middleware stack.
+
+Run benchmarks from the backend directory, e.g.
+``python -m benchmarks.bench_payloads``.
+"""
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Must be configured before the app (and its engine) is imported
+_tmpdir = tempfile.mkdtemp(prefix="slotswapper-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.middleware.rate_limiter import rate_limiter  # noqa: E402
+from app.utils import hash_password  # noqa: E402
+
+
+def seed(users: int, events_per_user: int, swappable_ratio: float = 0.5, requests: int = 0) -> list[dict]:
+    """Insert users with non-overlapping events; return auth headers per user"""
+    password_hash = hash_password("benchmark")
+    base = datetime(2030, 1, 1, 8)
+    with SessionLocal() as db:
+        owners = [models.User(name=f"User {i}", email=f"user{i}@bench.test", password_hash=password_hash)
+                  for i in range(users)]
+        db.add_all(owners)
+        db.flush()
+        swappable_every = max(1, round(1 / swappable_ratio)) if swappable_ratio else 0
+        slots = []
+        for owner in owners:
+            for j in range(events_per_user):
+                status = "SWAPPABLE" if swappable_every and j % swappable_every == 0 else "BUSY"
+                slots.append(models.Event(
+                    title=f"Slot {j} of {owner.name}",
+                    start_time=base + timedelta(hours=2 * j),
+                    end_time=base + timedelta(hours=2 * j, minutes=60),
+                    status=status,
+                    owner_id=owner.id,
+                ))
+        db.add_all(slots)
+        db.flush()
+        by_owner = {}
+        for slot in slots:
+            by_owner.setdefault(slot.owner_id, []).append(slot)
+        for i in range(requests):
+            requester, responder = owners[i % users], owners[(i + 1) % users]
+            db.add(models.SwapRequest(
+                requester_id=requester.id,
+                responder_id=responder.id,
+                my_slot_id=by_owner[requester.id][i % events_per_user].id,
+                their_slot_id=by_owner[responder.id][i % events_per_user].id,
+            ))
+        db.commit()
+        return [{"Authorization": f"Bearer {create_access_token({'sub': str(o.id)})}"} for o in owners]
+
+
+def timed(fn, repeat: int = 20) -> tuple[float, float]:
+    """Median and p95 wall time of ``fn`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def client() -> TestClient:
+    # Benchmarks issue far more than the per-minute allowance from one client
+    rate_limiter.requests_per_minute = float("inf")
+    return TestClient(app)
@@ -0,0 +1,112 @@
+"""
+Move users and the rows they own onto the shards given by a new URL list.
+
+Run from the backend directory, e.g. to split a single database in three:
+
+    python -m scripts.rebalance_shards \
+        --from sqlite:///./slotswapper.db \
+        --to sqlite:///./shard0.db,sqlite:///./shard1.db,sqlite:///./shard2.db
+
+Each user is moved in its own two-shard transaction (the target commits
+first, then the source). Copies overwrite rows with the same id, so an
+interrupted run can simply be started again.
+"""
+import argparse
+
+from sqlalchemy import select, delete, insert, inspect, tuple_
+from sqlalchemy.engine import Connection
+
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.db import Base
+from app.sharding import ShardRouter, GLOBAL_SHARD, GLOBAL_TABLES
+
+
+def _owned_rows(conn: Connection, user_id: int) -> list[tuple]:
+    """(table, rows) pairs for everything a user owns, parents first"""
+    tables = Base.metadata.tables
+    owned = [
+        (tables["users"], tables["users"].c.id == user_id),
+        (tables["events"], tables["events"].c.owner_id == user_id),
+        (tables["recurrence_rules"], tables["recurrence_rules"].c.owner_id == user_id),
+        (tables["swap_requests"], tables["swap_requests"].c.requester_id == user_id),
+    ]
+    rule_ids = select(tables["recurrence_rules"].c.id).where(tables["recurrence_rules"].c.owner_id == user_id)
+    owned.append((tables["recurrence_exceptions"], tables["recurrence_exceptions"].c.rule_id.in_(rule_ids)))
+    return [(table, conn.execute(select(table).where(criteria)).mappings().all()) for table, criteria in owned]
+
+
+def _by_key(table, rows):
+    """WHERE clause matching ``rows`` on the table's primary key"""
+    columns = list(table.primary_key.columns)
+    if len(columns) == 1:
+        return columns[0].in_([row[columns[0].key] for row in rows])
+    return tuple_(*columns).in_([tuple(row[c.key] for c in columns) for row in rows])
+
+
+def _copy(target: Connection, table, rows):
+    if rows:
+        target.execute(delete(table).where(_by_key(table, rows)))
+        target.execute(insert(table), [dict(row) for row in rows])
+
+
+def _purge(source: Connection, table, rows):
+    if rows:
+        source.execute(delete(table).where(_by_key(table, rows)))
+
+
+def move_user(user_id: int, source_engine, target_engine):
+    with source_engine.begin() as source, target_engine.begin() as target:
+        batches = _owned_rows(source, user_id)
+        for table, rows in batches:
+            _copy(target, table, rows)
+        for table, rows in reversed(batches):
+            _purge(source, table, rows)
+
+
+def rebalance(source_urls: list[str], target_urls: list[str]) -> int:
+    source = ShardRouter(source_urls)
+    target = ShardRouter(target_urls)
+    target.create_all(Base.metadata)
+
+    users = Base.metadata.tables["users"]
+    moved = 0
+    for shard_id, url in enumerate(source_urls):
+        engine = source.engines[str(shard_id)]
+        with engine.connect() as conn:
+            user_ids = conn.execute(select(users.c.id).order_by(users.c.id)).scalars().all()
+        for user_id in user_ids:
+            destination = target.shard_for_user(user_id)
+            if target_urls[int(destination)] == url:
+                continue
+            move_user(user_id, engine, target.engines[destination])
+            moved += 1
+            if moved % 100 == 0:
+                print(f"moved {moved} users")
+
+    # Bookkeeping tables follow the global shard if it changed
+    if source_urls[0] != target_urls[0]:
+        with source.engines[GLOBAL_SHARD].begin() as src, target.engines[GLOBAL_SHARD].begin() as dst:
+            for name in GLOBAL_TABLES:
+                table = Base.metadata.tables[name]
+                if not inspect(src).has_table(name):
+                    continue  # Source predates this table
+                rows = src.execute(select(table)).mappings().all()
+                _copy(dst, table, rows)
+                _purge(src, table, rows)
+
+    target.allocator.reseed()
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebalance SlotSwapper data across shards")
+    parser.add_argument("--from", dest="source", required=True, help="Comma-separated current shard URLs")
+    parser.add_argument("--to", dest="target", required=True, help="Comma-separated new shard URLs")
+    args = parser.parse_args()
+
+    moved = rebalance(args.source.split(","), args.target.split(","))
+    print(f"Done: moved {moved} users")
+
+
+if __name__ == "__main__":
+    main()
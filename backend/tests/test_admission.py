@@ -0,0 +1,147 @@
+import asyncio
+import random
+
+import pytest
+
+from app.middleware import admission
+from app.middleware.admission import ConcurrencyLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", fake)
+    return fake
+
+
+def adaptive_limiter(limit=16):
+    return ConcurrencyLimiter(limit, 1, 64, 64, adaptive=True, tolerance=2.0)
+
+
+def run_saturated(limiter, clock, latencies):
+    """Keep the limiter full: every finished request is replaced at once"""
+    limiter.in_flight = int(limiter.limit)
+    for latency in latencies:
+        clock.now += latency
+        limiter.release(latency)
+        limiter.in_flight = int(limiter.limit)
+
+
+def test_normal_variance_does_not_collapse_limit(clock):
+    rng = random.Random(42)
+    limiter = adaptive_limiter()
+    run_saturated(limiter, clock, [rng.uniform(0.002, 0.020) for _ in range(20000)])
+    assert limiter.limit >= 16
+
+
+def test_sustained_slowdown_cuts_limit(clock):
+    rng = random.Random(7)
+    limiter = adaptive_limiter()
+    run_saturated(limiter, clock, [rng.uniform(0.002, 0.020) for _ in range(2000)])
+    before = limiter.limit
+    run_saturated(limiter, clock, [rng.uniform(0.100, 0.120) for _ in range(100)])
+    assert limiter.limit < before
+
+
+def test_unsaturated_route_keeps_its_limit(clock):
+    limiter = adaptive_limiter()
+    limiter.in_flight = 1
+    for latency in [0.005] * 500 + [0.500] * 500:
+        clock.now += latency
+        limiter.release(latency)
+        limiter.in_flight = 1
+    assert limiter.limit == 16
+
+
+def fixed_limiter(limit=1, max_queue=4):
+    return ConcurrencyLimiter(limit, limit, limit, max_queue)
+
+
+def test_acquire_within_limit_is_immediate():
+    async def run():
+        limiter = fixed_limiter(limit=2)
+        await limiter.acquire(admission.Priority.NORMAL, 0.01)
+        await limiter.acquire(admission.Priority.NORMAL, 0.01)
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["in_flight"], stats["queued"]) == (2, 0)
+
+
+def test_release_serves_waiters_by_priority():
+    async def run():
+        limiter = fixed_limiter()
+        await limiter.acquire(admission.Priority.NORMAL, 1)
+        order = []
+
+        async def wait(priority):
+            await limiter.acquire(priority, 1)
+            order.append(priority)
+            limiter.release(None)
+
+        waiters = [asyncio.create_task(wait(p)) for p in
+                   (admission.Priority.LOW, admission.Priority.NORMAL, admission.Priority.HIGH)]
+        await asyncio.sleep(0)
+        limiter.release(None)
+        await asyncio.gather(*waiters)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == [admission.Priority.HIGH, admission.Priority.NORMAL, admission.Priority.LOW]
+    assert (stats["in_flight"], stats["queued"]) == (0, 0)
+
+
+def test_waiter_is_shed_after_timeout():
+    async def run():
+        limiter = fixed_limiter()
+        await limiter.acquire(admission.Priority.NORMAL, 1)
+        with pytest.raises(admission.Shed):
+            await limiter.acquire(admission.Priority.NORMAL, 0.01)
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["in_flight"], stats["queued"], stats["shed"]) == (1, 0, 1)
+
+
+def test_full_queue_evicts_lower_priority_waiter():
+    async def run():
+        limiter = fixed_limiter(max_queue=1)
+        await limiter.acquire(admission.Priority.NORMAL, 1)
+        low = asyncio.create_task(limiter.acquire(admission.Priority.LOW, 1))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(limiter.acquire(admission.Priority.HIGH, 1))
+        await asyncio.sleep(0)
+        with pytest.raises(admission.Shed):
+            await low
+        # A second NORMAL request finds only a higher-priority waiter and is turned away
+        with pytest.raises(admission.Shed):
+            await limiter.acquire(admission.Priority.NORMAL, 1)
+        limiter.release(None)
+        await high
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["in_flight"], stats["queued"], stats["shed"]) == (1, 0, 2)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        limiter = fixed_limiter()
+        await limiter.acquire(admission.Priority.NORMAL, 1)
+        waiter = asyncio.create_task(limiter.acquire(admission.Priority.NORMAL, 1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release(None)
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["in_flight"], stats["queued"]) == (0, 0)
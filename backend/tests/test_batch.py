@@ -0,0 +1,103 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import Depends, HTTPException
+from fastapi.testclient import TestClient
+
+from app import models
+from app.db import get_db
+from app.deps import get_current_user
+from app.main import app
+from app.middleware.rate_limiter import rate_limiter
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "requests", defaultdict(list))
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    email = f"{uuid4().hex}@example.com"
+    client.post("/auth/register", json={"name": "Batcher", "email": email, "password": "secret1"})
+    token = client.post("/auth/login", json={"email": email, "password": "secret1"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def new_event(title, day=1):
+    start = datetime(2031, 1, day, 9)
+    return {"title": title, "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat()}
+
+
+def batch(client, headers, *requests):
+    response = client.post("/batch", json={"requests": list(requests)}, headers=headers)
+    assert response.status_code == 200
+    return response.json()["responses"]
+
+
+def test_each_item_gets_its_own_status(client, headers):
+    responses = batch(
+        client, headers,
+        {"method": "GET", "path": "/events/stats"},
+        {"method": "POST", "path": "/events/", "body": {"title": "No times"}},
+        {"method": "DELETE", "path": "/events/999999"},
+    )
+    assert [r["status"] for r in responses] == [200, 422, 404]
+    assert responses[0]["body"]["total_events"] == 0
+
+
+def test_reads_see_earlier_writes_only(client, headers):
+    responses = batch(
+        client, headers,
+        {"method": "GET", "path": "/events/"},
+        {"method": "POST", "path": "/events/", "body": new_event("Gym")},
+        {"method": "GET", "path": "/events/"},
+    )
+    assert [r["status"] for r in responses] == [200, 200, 200]
+    assert responses[0]["body"] == []
+    assert [e["title"] for e in responses[2]["body"]] == ["Gym"]
+
+
+@pytest.fixture
+def half_write_route():
+    # Stages a row, then fails like a write that was rejected halfway through
+    def half_write(db=Depends(get_db), current_user: models.User = Depends(get_current_user)):
+        start = datetime(2031, 1, 5, 9)
+        db.add(models.Event(title="Half", start_time=start, end_time=start + timedelta(hours=1),
+                            owner_id=current_user.id))
+        db.flush()
+        raise HTTPException(status_code=409, detail="Conflict")
+
+    app.router.add_api_route("/test/half-write", half_write, methods=["POST"])
+    yield
+    app.router.routes.pop()
+
+
+def test_failed_write_is_rolled_back(client, headers, half_write_route):
+    responses = batch(
+        client, headers,
+        {"method": "POST", "path": "/test/half-write"},
+        {"method": "POST", "path": "/events/", "body": new_event("Kept", day=6)},
+    )
+    assert [r["status"] for r in responses] == [409, 200]
+    titles = [e["title"] for e in client.get("/events/", headers=headers).json()]
+    assert titles == ["Kept"]
+
+
+@pytest.mark.parametrize("path", ["/batch", "/batch/", "/auth/login", "/auth/register"])
+def test_nested_batches_and_auth_calls_are_rejected(client, headers, path):
+    response = client.post("/batch", json={"requests": [{"method": "POST", "path": path, "body": {}}]},
+                           headers=headers)
+    assert response.status_code == 400
+
+
+def test_sub_requests_count_against_the_rate_limit(client, headers, monkeypatch):
+    rate_limiter.requests.clear()
+    monkeypatch.setattr(rate_limiter, "requests_per_minute", 3)
+    # The batch itself takes one slot, leaving two for its items
+    responses = batch(client, headers, *[{"method": "GET", "path": "/events/stats"}] * 3)
+    assert sorted(r["status"] for r in responses) == [200, 200, 429]
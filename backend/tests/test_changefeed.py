@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.changefeed import compact, sequence_changes
+from app.core.config import settings
+from app.db import Base
+from app.routers.sync import get_changes
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine, autoflush=False)() as db:
+        db.add(models.User(id=1, name="Alice", email="alice@example.com", password_hash="x"))
+        db.commit()
+        yield db
+
+
+def changes(db, since=0, limit=500):
+    user = db.get(models.User, 1)
+    return get_changes(since=since, limit=limit, db=db, current_user=user)
+
+
+def rule(**kwargs):
+    return models.RecurrenceRule(
+        title="Standup", owner_id=1, dtstart=datetime(2030, 1, 1, 9), duration_minutes=30,
+        freq=models.Frequency.DAILY, interval=1, count=5, **kwargs
+    )
+
+
+def test_sync_returns_changes_in_order_and_pages(db):
+    event = models.Event(title="Gym", start_time=datetime(2030, 1, 1, 9),
+                         end_time=datetime(2030, 1, 1, 10), owner_id=1)
+    db.add(event)
+    db.commit()
+    event.status = "SWAPPABLE"
+    db.commit()
+    db.delete(event)
+    db.commit()
+
+    first = changes(db, limit=2)
+    assert first["has_more"]
+    rest = changes(db, since=first["seq"])
+    assert not rest["has_more"]
+    feed = [(c["entity"], c["op"]) for c in first["changes"] + rest["changes"]]
+    assert feed == [
+        ("event", "UPSERT"),
+        ("event", "UPSERT"), ("swappable_slot", "UPSERT"),
+        ("event", "DELETE"), ("swappable_slot", "DELETE"),
+    ]
+    assert changes(db, since=rest["seq"])["changes"] == []
+
+
+def test_writers_leave_entries_pending_for_the_sequencer(db):
+    for title in ("First", "Second"):
+        db.add(models.Event(title=title, start_time=datetime(2030, 1, 1, 9),
+                            end_time=datetime(2030, 1, 1, 10), owner_id=1))
+        db.commit()
+    assert db.query(models.ChangeLogEntry).count() == 0
+    assert db.query(models.ChangeLogPending).count() == 2
+
+    assert sequence_changes(db) == 2
+    assert sequence_changes(db) == 0
+    entries = db.query(models.ChangeLogEntry).order_by(models.ChangeLogEntry.seq).all()
+    assert [json.loads(e.payload)["title"] for e in entries] == ["First", "Second"]
+    assert db.query(models.ChangeLogPending).count() == 0
+
+
+def test_recurring_series_and_exceptions_are_synced(db):
+    series = rule()
+    db.add(series)
+    db.commit()
+    occurrence = models.Event(title="Standup", start_time=datetime(2030, 1, 2, 9),
+                              end_time=datetime(2030, 1, 2, 9, 30), owner_id=1,
+                              recurrence_id=series.id, occurrence_start=datetime(2030, 1, 2, 9))
+    db.add(occurrence)
+    series.exceptions.append(models.RecurrenceException(occurrence_start=datetime(2030, 1, 3, 9)))
+    db.commit()
+    since = changes(db)["seq"]
+
+    latest = [c for c in changes(db)["changes"] if c["entity"] == "recurrence_rule"][-1]
+    assert latest["data"]["rrule"] == "FREQ=DAILY;COUNT=5"
+    assert latest["data"]["exceptions"] == ["2030-01-03T09:00:00"]
+
+    db.delete(series)
+    for event in db.query(models.Event).filter(models.Event.recurrence_id == series.id):
+        event.recurrence_id = None
+        event.occurrence_start = None
+    db.commit()
+
+    feed = {c["entity"]: c for c in changes(db, since=since)["changes"]}
+    assert feed["recurrence_rule"]["op"] == "DELETE"
+    assert feed["event"]["data"]["recurrence_id"] is None
+
+
+def test_compaction_drops_superseded_entries_and_old_tombstones(db):
+    event = models.Event(title="Gym", start_time=datetime(2030, 1, 1, 9),
+                         end_time=datetime(2030, 1, 1, 10), owner_id=1)
+    db.add(event)
+    db.commit()
+    event.title = "Swim"
+    db.commit()
+    cursor = changes(db)["seq"]
+
+    later = datetime.utcnow() + timedelta(hours=settings.CHANGE_LOG_RETENTION_HOURS + 1)
+    assert compact(db, later) == (1, 0)
+    assert [c["data"]["title"] for c in changes(db)["changes"]] == ["Swim"]
+
+    db.delete(event)
+    db.commit()
+    much_later = datetime.utcnow() + timedelta(hours=settings.CHANGE_LOG_TOMBSTONE_RETENTION_HOURS + 1)
+    assert compact(db, much_later) == (1, 1)
+    assert changes(db)["changes"] == []
+    # The purged tombstone was after this cursor, so the client must start over
+    assert changes(db, since=cursor)["reset"]
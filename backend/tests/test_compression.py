@@ -0,0 +1,78 @@
+import asyncio
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.middleware import compression
+from app.middleware.compression import ResponseCompressor, parse_accept_encoding
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", SimpleNamespace(compress=lambda body, quality: b"br:" + body))
+
+
+def test_q_values_are_parsed():
+    assert parse_accept_encoding("gzip;q=0.5, br;q=0, *;q=bogus, identity") == {
+        "gzip": 0.5, "br": 0.0, "*": 0.0, "identity": 1.0,
+    }
+
+
+def test_gzip_negotiation(without_brotli):
+    compressor = ResponseCompressor()
+    assert compressor.choose_encoding("gzip, deflate") == "gzip"
+    assert compressor.choose_encoding("*") == "gzip"
+    assert compressor.choose_encoding("gzip;q=0") is None
+    assert compressor.choose_encoding("gzip;q=0, *") is None
+    assert compressor.choose_encoding("identity") is None
+    assert compressor.choose_encoding("br") is None
+
+
+def test_brotli_is_preferred_unless_refused(with_brotli):
+    compressor = ResponseCompressor()
+    assert compressor.choose_encoding("gzip, br") == "br"
+    assert compressor.choose_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert compressor.choose_encoding("br;q=0, *") == "gzip"
+
+
+def run(compressor, content, accept_encoding="gzip", headers=None):
+    request = Request({
+        "type": "http", "method": "GET", "path": "/", "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    })
+
+    async def call_next(request):
+        # What the routers' responses look like once they pass through call_next
+        body = JSONResponse(content).body
+        return StreamingResponse(iter([body]), media_type="application/json", headers=headers)
+
+    return asyncio.run(compressor.dispatch(request, call_next))
+
+
+def test_large_responses_are_compressed(without_brotli):
+    content = [{"title": "Slot"}] * 100
+    response = run(ResponseCompressor(minimum_size=100), content)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(response.body)
+    assert gzip.decompress(response.body) == JSONResponse(content).body
+
+
+def test_small_responses_are_sent_as_is_but_still_vary(without_brotli):
+    response = run(ResponseCompressor(minimum_size=1024), {"ok": True}, headers={"vary": "Origin"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+    assert response.body == b'{"ok":true}'
+
+
+def test_refused_coding_leaves_the_body_alone(without_brotli):
+    response = run(ResponseCompressor(minimum_size=1), [{"title": "Slot"}] * 100, accept_encoding="gzip;q=0")
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app import models
+from app.tasks import expiry
+from app.tasks.expiry import ExpiryScheduler, expiry_deadline
+
+
+def event(start):
+    return models.Event(start_time=start, end_time=start + timedelta(hours=1))
+
+
+def test_deadline_is_the_earliest_of_ttl_and_slot_starts():
+    now = datetime(2030, 1, 1)
+    soon = now + timedelta(hours=2)
+    later = now + timedelta(days=30)
+    assert expiry_deadline(event(soon), event(later), now) == soon
+    assert expiry_deadline(event(later), event(later), now) == now + timedelta(
+        minutes=expiry.settings.SWAP_REQUEST_TTL_MINUTES)
+
+
+def test_scheduler_survives_database_errors(monkeypatch):
+    monkeypatch.setattr(expiry, "REFILL_RETRY_SECONDS", 0.01)
+    attempts = []
+
+    def broken_session():
+        attempts.append(1)
+        raise RuntimeError("database is down")
+
+    async def run():
+        scheduler = ExpiryScheduler(session_factory=broken_session)
+        await scheduler.start()
+        await asyncio.sleep(0.1)
+        alive = not scheduler._task.done()
+        await scheduler.stop()
+        return alive
+
+    assert asyncio.run(run())
+    assert len(attempts) > 1
@@ -0,0 +1,45 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.db import Base
+from app.utils.fields import EVENT_FIELDS, load_event_columns, parse_fields, sparse_response
+
+
+def test_fields_come_back_in_canonical_order():
+    assert parse_fields(None, EVENT_FIELDS) is None
+    assert parse_fields("", EVENT_FIELDS) is None
+    # EventOut declares title before id
+    assert parse_fields(" id ,title,,id", EVENT_FIELDS) == ["title", "id"]
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("id,password_hash", EVENT_FIELDS)
+    assert exc.value.status_code == 400
+    assert "password_hash" in exc.value.detail
+
+
+def test_only_requested_columns_are_loaded():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(models.User(id=1, name="Alice", email="alice@example.com", password_hash="x"))
+        db.add(models.Event(id=1, title="Gym", start_time=datetime(2030, 1, 1, 9),
+                            end_time=datetime(2030, 1, 1, 10), owner_id=1))
+        db.commit()
+        db.expunge_all()
+
+        event = db.query(models.Event).options(load_event_columns(["title"], "start_time")).one()
+        unloaded = inspect(event).unloaded
+        assert {"title", "start_time", "id"}.isdisjoint(unloaded)
+        assert {"end_time", "status", "owner_id"} <= unloaded
+
+        response = sparse_response([event], ["id", "title"])
+        assert json.loads(response.body) == [{"id": 1, "title": "Gym"}]
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.db import Base
+from app.ical_import import import_events
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        db.add(models.User(id=1, name="Alice", email="alice@example.com", password_hash="x"))
+        db.commit()
+    return factory
+
+
+def calendar(*events):
+    lines = ["BEGIN:VCALENDAR"]
+    for uid, start, end in events:
+        lines += ["BEGIN:VEVENT", f"UID:{uid}", f"DTSTART:{start}", f"DTEND:{end}", "SUMMARY:Imported", "END:VEVENT"]
+    return lines + ["END:VCALENDAR"]
+
+
+def test_conflict_with_event_inside_a_longer_one(session_factory):
+    with session_factory() as db:
+        # Overlapping existing events, e.g. after a swap: the short one ends first
+        db.add_all([
+            models.Event(title="Long", start_time=datetime(2030, 1, 1, 9), end_time=datetime(2030, 1, 1, 12),
+                         status="BUSY", owner_id=1),
+            models.Event(title="Short", start_time=datetime(2030, 1, 1, 10), end_time=datetime(2030, 1, 1, 11),
+                         status="BUSY", owner_id=1),
+        ])
+        db.commit()
+
+    lines = calendar(
+        ("early", "20300101T080000Z", "20300101T083000Z"),
+        ("a", "20300101T113000Z", "20300101T114500Z"),
+        ("b", "20300101T120000Z", "20300101T130000Z"),
+    )
+    report = list(import_events(lines, 1, session_factory=session_factory))[-1]
+    assert report.imported == 2
+    assert report.skipped == 1
+    assert report.errors[0]["uid"] == "a"
+
+
+def test_reimport_counts_duplicates(session_factory):
+    lines = calendar(("a", "20300101T090000Z", "20300101T100000Z"))
+    list(import_events(lines, 1, session_factory=session_factory))
+    report = list(import_events(lines, 1, session_factory=session_factory))[-1]
+    assert (report.imported, report.duplicates) == (0, 1)
@@ -0,0 +1,42 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.idempotency import IdempotencyStore
+
+
+def make_app(statuses):
+    app = FastAPI()
+    store = IdempotencyStore()
+    calls = []
+
+    @app.middleware("http")
+    async def idempotency(request: Request, call_next):
+        return await store.dispatch(request, call_next)
+
+    @app.post("/things")
+    def create_thing():
+        calls.append(1)
+        return JSONResponse(status_code=statuses[len(calls) - 1], content={"call": len(calls)})
+
+    return app, calls
+
+
+def test_success_is_replayed():
+    app, calls = make_app([201, 201])
+    client = TestClient(app)
+    first = client.post("/things", json={}, headers={"Idempotency-Key": "a"})
+    second = client.post("/things", json={}, headers={"Idempotency-Key": "a"})
+    assert second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_rate_limited_response_is_not_replayed():
+    app, calls = make_app([429, 201])
+    client = TestClient(app)
+    assert client.post("/things", json={}, headers={"Idempotency-Key": "a"}).status_code == 429
+    retry = client.post("/things", json={}, headers={"Idempotency-Key": "a"})
+    assert retry.status_code == 201
+    assert len(calls) == 2
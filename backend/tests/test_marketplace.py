@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from app import models
+from app.marketplace import MarketplaceIndex, SlotRecord
+
+
+def slot(event_id, day, title="Slot", owner_id=1):
+    return SlotRecord(models.Event(
+        id=event_id, title=title, start_time=datetime(2030, 1, day, 9), end_time=datetime(2030, 1, day, 10),
+        status="SWAPPABLE", owner_id=owner_id,
+    ))
+
+
+def titles(index):
+    return [(r.id, r.title) for r in index.window()]
+
+
+def test_window_is_sorted_by_start_time():
+    index = MarketplaceIndex()
+    index.load([slot(1, 3), slot(2, 1), slot(3, 2)])
+    assert [r.id for r in index.window()] == [2, 3, 1]
+    assert [r.id for r in index.window(start=datetime(2030, 1, 2), end=datetime(2030, 1, 2, 23))] == [3]
+    assert [r.id for r in index.window(exclude_owner=1)] == []
+
+
+def test_stale_change_applied_late_is_dropped():
+    index = MarketplaceIndex()
+    index.load([])
+    index.apply({1: (2, slot(1, 1, "newer"))})
+    index.apply({1: (1, slot(1, 1, "older"))})
+    assert titles(index) == [(1, "newer")]
+    index.apply({1: (3, None)})
+    assert titles(index) == []
+
+
+def test_repair_keeps_changes_made_during_the_load():
+    index = MarketplaceIndex()
+    index.load([slot(1, 1), slot(2, 2)])
+    since = index.version
+    # Read from the database: event 2 was unlisted by another process, and
+    # event 3 was listed here after the read started
+    from_db = [slot(1, 1)]
+    index.apply({3: (1, slot(3, 3))})
+
+    assert index.repair(from_db, since=since)
+    assert [r.id for r in index.window()] == [1, 3]
+    assert not index.repair([slot(1, 1), slot(3, 3)], since=index.version)
+
+
+def test_repair_and_load_forget_changes_the_database_read_covers():
+    index = MarketplaceIndex()
+    index.load([])
+    index.apply({1: (1, slot(1, 1)), 2: (2, slot(2, 2))})
+    since = index.version
+    index.apply({3: (3, slot(3, 3))})
+
+    index.repair([slot(1, 1), slot(2, 2)], since=since)
+    # Event 3 changed after the read started, so its stamp is still needed
+    assert set(index._applied) == {3}
+
+    since = index.version
+    index.load([slot(1, 1), slot(2, 2), slot(3, 3)], since=since)
+    assert index._applied == {}
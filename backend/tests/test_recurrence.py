@@ -0,0 +1,88 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import models
+from app.utils.recurrence import WEEKDAY_CODES, occurrence_starts, parse_rrule, series_end
+
+
+def rule(rrule, dtstart=datetime(2030, 1, 2, 9), minutes=60):
+    # 2030-01-02 is a Wednesday
+    return models.RecurrenceRule(title="Series", owner_id=1, dtstart=dtstart, duration_minutes=minutes,
+                                 **parse_rrule(rrule))
+
+
+def brute_force(r, until):
+    """Every occurrence start up to ``until``, found by walking day by day"""
+    days = [WEEKDAY_CODES.index(d) for d in r.by_weekday.split(",")] if r.by_weekday else [r.dtstart.weekday()]
+    anchor = (r.dtstart - timedelta(days=r.dtstart.weekday())).date()
+    starts, day = [], r.dtstart
+    while day < until:
+        if r.freq == "DAILY":
+            matches = (day.date() - r.dtstart.date()).days % r.interval == 0
+        else:
+            matches = day.weekday() in days and (day.date() - anchor).days // 7 % r.interval == 0
+        if matches:
+            if (r.count is not None and len(starts) >= r.count) or (r.until is not None and day > r.until):
+                break
+            starts.append(day)
+        day += timedelta(days=1)
+    return starts
+
+
+def test_daily_count():
+    r = rule("FREQ=DAILY;COUNT=3")
+    starts = list(occurrence_starts(r, datetime(2030, 1, 1), datetime(2030, 2, 1)))
+    assert starts == [datetime(2030, 1, 2, 9), datetime(2030, 1, 3, 9), datetime(2030, 1, 4, 9)]
+    assert series_end(r) == datetime(2030, 1, 4, 10)
+
+
+def test_weekly_byday_count_skips_days_before_dtstart():
+    r = rule("FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=5")
+    starts = list(occurrence_starts(r, datetime(2030, 1, 1), datetime(2030, 2, 1)))
+    assert [s.day for s in starts] == [2, 4, 7, 9, 11]
+    assert series_end(r) == datetime(2030, 1, 11, 10)
+
+
+def test_until_is_inclusive():
+    r = rule("FREQ=DAILY;INTERVAL=2;UNTIL=20300106T090000")
+    assert [s.day for s in occurrence_starts(r, datetime(2030, 1, 1), datetime(2030, 2, 1))] == [2, 4, 6]
+    assert series_end(r) == datetime(2030, 1, 6, 10)
+
+
+def test_window_includes_occurrence_already_in_progress():
+    r = rule("FREQ=DAILY", minutes=120)
+    starts = list(occurrence_starts(r, datetime(2030, 1, 5, 10), datetime(2030, 1, 5, 12)))
+    assert starts == [datetime(2030, 1, 5, 9)]
+    assert series_end(r) is None
+
+
+@pytest.mark.parametrize("rrule", [
+    "FREQ=DAILY;COUNT=17",
+    "FREQ=DAILY;INTERVAL=3;UNTIL=20300401",
+    "FREQ=WEEKLY;COUNT=9",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TU,SU;COUNT=20",
+    "FREQ=WEEKLY;INTERVAL=3;BYDAY=WE,SA;UNTIL=20300615T120000",
+    "FREQ=WEEKLY;INTERVAL=4;BYDAY=MO;UNTIL=20300520",
+])
+def test_matches_brute_force(rrule):
+    r = rule(rrule)
+    expected = brute_force(r, datetime(2031, 1, 1))
+    assert series_end(r) == expected[-1] + timedelta(minutes=r.duration_minutes)
+
+    rng = random.Random(rrule)
+    for _ in range(50):
+        window_start = datetime(2030, 1, 1) + timedelta(hours=rng.randrange(0, 24 * 200))
+        window_end = window_start + timedelta(hours=rng.randrange(1, 24 * 30))
+        duration = timedelta(minutes=r.duration_minutes)
+        in_window = [s for s in expected if s < window_end and s + duration > window_start]
+        assert list(occurrence_starts(r, window_start, window_end)) == in_window
+
+
+@pytest.mark.parametrize("rrule", ["FREQ=MONTHLY", "FREQ=DAILY;BYDAY=MO", "FREQ=DAILY;COUNT=0",
+                                   "FREQ=DAILY;COUNT=2;UNTIL=20300101", "FREQ=WEEKLY;BYDAY=XX"])
+def test_rejects_unsupported_rules(rrule):
+    with pytest.raises(HTTPException):
+        parse_rrule(rrule)
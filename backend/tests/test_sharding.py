@@ -0,0 +1,153 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam, create_engine, delete, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import marketplace, models, sharding
+from app.db import Base, get_db
+from app.main import app
+from app.middleware.rate_limiter import rate_limiter
+from app.routers import swap
+from app.sharding import ShardRouter, _routing_values
+from scripts.rebalance_shards import rebalance
+
+events = inspect(models.Event)
+
+
+def routed(statement, parameters=None, mapper=events):
+    return _routing_values(statement, parameters or {}, mapper)
+
+
+def test_equality_on_routing_column():
+    assert routed(select(models.Event).where(models.Event.owner_id == 3)) == {3}
+
+
+def test_in_list_and_nested_conjunctions():
+    statement = select(models.Event).where(
+        models.Event.owner_id.in_([1, 2]), models.Event.status == "BUSY", models.Event.id > 10
+    )
+    assert routed(statement) == {1, 2}
+
+
+def test_bound_parameter_value_comes_from_parameters():
+    statement = select(models.Event).where(models.Event.owner_id == bindparam("owner"))
+    assert routed(statement, {"owner": 7}) == {7}
+
+
+def test_updates_and_deletes_are_routed():
+    assert routed(update(models.Event).where(models.Event.owner_id == 4).values(title="x")) == {4}
+    assert routed(delete(models.Event).where(models.Event.owner_id == 5)) == {5}
+
+
+def test_unrestricted_statements_fan_out():
+    assert routed(select(models.Event)) == set()
+    assert routed(select(models.Event).where(models.Event.id == 3)) == set()
+    assert routed(select(models.Event).where(or_(models.Event.owner_id == 1, models.Event.owner_id == 2))) == set()
+    assert routed(select(models.Event).where(models.Event.owner_id == 1), mapper=None) == set()
+
+
+def test_routing_column_depends_on_table():
+    swaps = inspect(models.SwapRequest)
+    assert routed(select(models.SwapRequest).where(models.SwapRequest.requester_id == 9), mapper=swaps) == {9}
+    assert routed(select(models.SwapRequest).where(models.SwapRequest.responder_id == 9), mapper=swaps) == set()
+    users = inspect(models.User)
+    assert routed(select(models.User).where(models.User.id == 6), mapper=users) == {6}
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    router = ShardRouter([f"sqlite:///{tmp_path}/shard0.db", f"sqlite:///{tmp_path}/shard1.db"])
+    router.create_all(Base.metadata)
+    for module in (sharding, swap, marketplace):
+        monkeypatch.setattr(module, "shard_router", router)
+    # Served from the shards rather than an index loaded by an earlier test
+    monkeypatch.setattr(marketplace.marketplace, "ready", False)
+    monkeypatch.setattr(rate_limiter, "requests", defaultdict(list))
+    factory = router.sessionmaker()
+
+    def get_sharded_db():
+        with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_sharded_db
+    yield router
+    app.dependency_overrides.pop(get_db)
+
+
+def shard_rows(router, model):
+    rows = {}
+    for shard_id, engine in router.engines.items():
+        with Session(engine) as db:
+            rows[shard_id] = db.scalars(select(model)).all()
+    return rows
+
+
+def test_accepted_swap_moves_each_slot_to_its_new_owners_shard(shards):
+    client = TestClient(app)
+    users = []
+    for name in ("odd", "even"):
+        client.post("/auth/register", json={"name": name, "email": f"{name}@example.com", "password": "secret1"})
+        token = client.post("/auth/login", json={"email": f"{name}@example.com", "password": "secret1"}).json()
+        users.append({"Authorization": f"Bearer {token['access_token']}"})
+    start = datetime(2031, 1, 1, 9)
+    slots = [
+        client.post("/events/", headers=headers, json={
+            "title": f"Slot {i}", "status": "SWAPPABLE",
+            "start_time": (start + timedelta(days=i)).isoformat(),
+            "end_time": (start + timedelta(days=i, hours=1)).isoformat(),
+        }).json()
+        for i, headers in enumerate(users)
+    ]
+    owners = [slot["owner_id"] for slot in slots]
+    assert {shards.shard_for_user(owner) for owner in owners} == {"0", "1"}
+
+    request = client.post("/swap/swap-request", headers=users[0],
+                          json={"mySlotId": slots[0]["id"], "theirSlotId": slots[1]["id"]}).json()
+    response = client.post(f"/swap/swap-response/{request['id']}", headers=users[1], json={"accept": True})
+    assert response.status_code == 200
+
+    events = shard_rows(shards, models.Event)
+    for shard_id, rows in events.items():
+        assert all(shards.shard_for_user(e.owner_id) == shard_id for e in rows)
+    placed = {e.id: e.owner_id for rows in events.values() for e in rows}
+    # Moved, not copied: each id is stored once
+    assert sum(len(rows) for rows in events.values()) == len(placed)
+    assert placed == {slots[0]["id"]: owners[1], slots[1]["id"]: owners[0]}
+    assert [e["title"] for e in client.get("/events/", headers=users[0]).json()] == ["Slot 1"]
+
+
+def test_rebalance_splits_one_database_in_two(tmp_path):
+    source_url, other_url = f"sqlite:///{tmp_path}/single.db", f"sqlite:///{tmp_path}/other.db"
+    engine = create_engine(source_url)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2031, 1, 1, 9)
+    with Session(engine) as db:
+        for user_id in (1, 2, 3, 4):
+            db.add(models.User(id=user_id, name=f"u{user_id}", email=f"u{user_id}@example.com", password_hash="x"))
+            db.add(models.Event(id=user_id, title="Slot", start_time=start, end_time=start + timedelta(hours=1),
+                                owner_id=user_id))
+        rule = models.RecurrenceRule(id=1, title="Standup", owner_id=3, dtstart=start, duration_minutes=30,
+                                     freq=models.Frequency.DAILY, interval=1)
+        rule.exceptions.append(models.RecurrenceException(occurrence_start=start))
+        db.add(rule)
+        db.add(models.SwapRequest(requester_id=1, responder_id=2, my_slot_id=1, their_slot_id=2))
+        db.commit()
+    engine.dispose()
+
+    assert rebalance([source_url], [source_url, other_url]) == 2
+
+    router = ShardRouter([source_url, other_url])
+    users = shard_rows(router, models.User)
+    assert [u.id for u in users["0"]] == [2, 4]
+    assert [u.id for u in users["1"]] == [1, 3]
+    events = shard_rows(router, models.Event)
+    assert [e.owner_id for e in events["0"]] == [2, 4]
+    assert [e.owner_id for e in events["1"]] == [1, 3]
+    assert [r.owner_id for r in shard_rows(router, models.RecurrenceRule)["1"]] == [3]
+    assert len(shard_rows(router, models.RecurrenceException)["1"]) == 1
+    assert [s.requester_id for s in shard_rows(router, models.SwapRequest)["1"]] == [1]
+    # New ids continue past everything that was moved
+    assert router.allocator.next_id("events") > 4
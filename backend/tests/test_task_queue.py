@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.db import Base
+from app.tasks import queue
+from app.tasks.queue import DatabaseBackend, Job, MemoryBackend, TaskQueue, retry_delay
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine, tables=[models.TaskJob.__table__])
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+@pytest.fixture
+def memory_queue(monkeypatch):
+    # The commit listeners release jobs to the global queue
+    task_queue = TaskQueue(MemoryBackend(), workers=1, batch_size=10, max_attempts=3)
+    monkeypatch.setattr(queue, "task_queue", task_queue)
+    return task_queue
+
+
+def test_jobs_are_released_only_on_commit(session_factory, memory_queue):
+    with session_factory() as db:
+        memory_queue.enqueue(db, "kept", n=1)
+        db.commit()
+        memory_queue.enqueue(db, "discarded", n=2)
+        db.rollback()
+        db.commit()
+    assert [job.name for job in memory_queue.backend._ready] == ["kept"]
+
+
+def test_durable_jobs_commit_and_roll_back_with_the_session(session_factory):
+    backend = DatabaseBackend(session_factory)
+    with session_factory() as db:
+        backend.stage(db, Job("kept", {"n": 1}))
+        db.commit()
+        backend.stage(db, Job("discarded", {"n": 2}))
+        db.rollback()
+    assert [job.name for job in backend._claim(10)] == ["kept"]
+
+
+def test_retry_delay_backs_off_exponentially_up_to_a_cap():
+    assert [retry_delay(n) for n in (1, 2, 3)] == [2, 4, 8]
+    assert retry_delay(20) == 300
+
+
+def test_failing_job_is_retried_until_max_attempts(monkeypatch, memory_queue):
+    monkeypatch.setattr(queue, "retry_delay", lambda attempts: 0)
+    attempts, failed = [], []
+
+    @queue.task("test.always_fails")
+    def always_fails(payload):
+        attempts.append(payload)
+        raise RuntimeError("boom")
+
+    async def record_failure(jobs):
+        failed.extend(jobs)
+
+    memory_queue.backend.fail = record_failure
+
+    async def run():
+        await memory_queue.start()
+        memory_queue.backend.push([Job("test.always_fails", {"n": 1})])
+        for _ in range(100):
+            if failed:
+                break
+            await asyncio.sleep(0.01)
+        await memory_queue.stop()
+
+    asyncio.run(run())
+    assert len(attempts) == 3
+    assert failed[0].attempts == 3
+    assert "boom" in failed[0].error
+
+
+def test_expired_lease_is_reclaimed(session_factory):
+    backend = DatabaseBackend(session_factory)
+    with session_factory() as db:
+        db.add(models.TaskJob(name="slow", payload="{}"))
+        db.commit()
+
+    claimed = backend._claim(10)
+    assert [job.name for job in claimed] == ["slow"]
+    # Leased to the first worker, so nobody else may take it
+    assert backend._claim(10) == []
+
+    with session_factory() as db:
+        db.execute(update(models.TaskJob).values(run_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+    assert [job.id for job in backend._claim(10)] == [claimed[0].id]
+
+
+def test_worker_survives_backend_errors(monkeypatch):
+    monkeypatch.setattr(queue, "WORKER_RETRY_SECONDS", 0.01)
+    backend = MemoryBackend()
+    calls = []
+    fetch = backend.fetch_batch
+
+    async def flaky_fetch(size):
+        calls.append(size)
+        if len(calls) == 1:
+            raise RuntimeError("database is down")
+        return await fetch(size)
+
+    async def broken_complete(jobs):
+        raise RuntimeError("database is down")
+
+    backend.fetch_batch = flaky_fetch
+    backend.complete = broken_complete
+    task_queue = TaskQueue(backend, workers=1, batch_size=10, max_attempts=3)
+
+    async def run():
+        await task_queue.start()
+        backend.push([Job("test.unknown", {})])
+        await asyncio.sleep(0.1)
+        alive = not task_queue._tasks[0].done()
+        await task_queue.stop()
+        return alive
+
+    assert asyncio.run(run())
+    assert len(calls) > 2